@@ -0,0 +1,92 @@
+import logging
+import os
+from typing import Dict
+
+from sqlalchemy import inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db.database import Base, SessionLocal
+from app.db.seed_catalog import seed_catalog
+from app.models import catalog, commerce, rate_limit, user  # noqa: F401 (registers tables for create_all)
+from app.models.schema_meta import SchemaMeta
+from app.services import product_search
+from app.services.figure_links import rebuild_links
+
+logger = logging.getLogger(__name__)
+
+# Bump SCHEMA_VERSION whenever a model gains a table, column or index, and
+# SEED_VERSION whenever the seed data should be applied again.
+SCHEMA_VERSION = "5"
+SEED_VERSION = "2"
+
+FORCE_SCHEMA_BOOTSTRAP = os.getenv("FORCE_SCHEMA_BOOTSTRAP", "").lower() in ("1", "true", "yes")
+
+
+def _read_meta(engine: Engine) -> Dict[str, str]:
+    try:
+        with engine.connect() as conn:
+            return dict(conn.execute(select(SchemaMeta.key, SchemaMeta.value)).all())
+    except SQLAlchemyError:
+        # First boot: schema_meta doesn't exist yet.
+        return {}
+
+
+def _write_meta(engine: Engine, values: Dict[str, str]) -> None:
+    with SessionLocal() as db:
+        for key, value in values.items():
+            db.merge(SchemaMeta(key=key, value=value))
+        db.commit()
+
+
+def _add_missing_columns(conn: Connection) -> None:
+    """Bring tables created by an older release up to the current models.
+
+    create_all() only creates missing tables, so new columns are added with
+    ALTER TABLE (as nullable, since existing rows have no value) and new
+    indexes are created if absent.
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            logger.info("Adding column %s.%s", table.name, column.name)
+            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def bootstrap_database(engine: Engine) -> None:
+    """Create the schema and seed the catalog once per version.
+
+    The versions applied are stored in schema_meta, so a restart against an
+    up-to-date database costs one small query instead of create_all(), the
+    full-text index setup and the seed checks.
+    """
+    meta = _read_meta(engine)
+    updates: Dict[str, str] = {}
+
+    if FORCE_SCHEMA_BOOTSTRAP or meta.get("schema_version") != SCHEMA_VERSION:
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            _add_missing_columns(conn)
+        updates["schema_version"] = SCHEMA_VERSION
+        updates["product_search"] = product_search.install_product_search(engine) or ""
+    else:
+        product_search.use_backend(meta.get("product_search") or None)
+
+    if FORCE_SCHEMA_BOOTSTRAP or meta.get("seed_version") != SEED_VERSION:
+        with SessionLocal() as db:
+            seed_catalog(db)
+        updates["seed_version"] = SEED_VERSION
+
+    if updates:
+        with SessionLocal() as db:
+            rebuild_links(db)
+        _write_meta(engine, updates)
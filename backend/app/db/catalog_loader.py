@@ -0,0 +1,208 @@
+"""Stream figures, events and products from JSONL or CSV files into the catalog.
+
+    python -m app.db.catalog_loader products products.jsonl
+    python -m app.db.catalog_loader figures figures.csv --batch-size 5000
+
+Rows are matched on `id`. Each row's content hash is stored alongside it, so
+reloading a file only writes the rows whose source data changed. Updates only
+touch the columns the file carries, and never live columns such as products'
+stock unless --update-live is given.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import sys
+from datetime import datetime
+from itertools import islice
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List
+
+from sqlalchemy import Boolean, Float, Integer, JSON, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db import change_events
+from app.models.catalog import HistoricalEvent, HistoricalFigure, Product
+
+logger = logging.getLogger(__name__)
+
+MODELS = {"figures": HistoricalFigure, "events": HistoricalEvent, "products": Product}
+DEFAULT_BATCH_SIZE = 2000
+
+# Maintained by the loader rather than read from the source file.
+_MANAGED_COLUMNS = {"content_hash", "created_at", "updated_at"}
+
+# Changed by the running app; a file sets them on insert but only updates
+# them when asked to.
+LIVE_COLUMNS = {"products": {"stock_quantity", "is_hot_item"}}
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """Yield one dict per JSONL line or CSV row without reading the whole file."""
+    with open(path, newline="", encoding="utf-8") as handle:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _parse_json(value: str):
+    # JSON-encoded lists, or "a|b|c" for hand-written CSV files.
+    return json.loads(value) if value[:1] in "[{" else [part.strip() for part in value.split("|")]
+
+
+def _converter(column) -> Callable:
+    """Return a function that turns a source value into the column's type.
+
+    CSV gives strings for everything; JSONL values are already typed.
+    """
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if isinstance(column.type, Integer):
+        parse = int
+    elif isinstance(column.type, Float):
+        parse = float
+    elif isinstance(column.type, Boolean):
+        parse = lambda value: value.strip().lower() in ("1", "true", "yes")  # noqa: E731
+    elif isinstance(column.type, JSON):
+        parse = _parse_json
+    else:
+        parse = str
+
+    def convert(value):
+        if value is None or value == "":
+            return default
+        return parse(value) if isinstance(value, str) else value
+
+    return convert
+
+
+_hash_encoder = json.JSONEncoder(separators=(",", ":"), default=str)
+
+
+def content_hash(values: List) -> str:
+    return hashlib.blake2b(_hash_encoder.encode(values).encode(), digest_size=16).hexdigest()
+
+
+def _upsert_statement(db: Session, table, columns: Iterable[str]):
+    """Insert every column; on an existing id, update only `columns`."""
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(table)
+    updated = {name: stmt.excluded[name] for name in list(columns) + ["content_hash", "updated_at"] if name != "id"}
+    return stmt.on_conflict_do_update(index_elements=["id"], set_=updated)
+
+
+def load_records(
+    db: Session,
+    kind: str,
+    records: Iterable[Dict],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    update_existing: bool = True,
+    update_live: bool = False,
+) -> Dict[str, int]:
+    """Upsert `records` into the `kind` table in batches and return counts.
+
+    Each batch costs one query for the stored hashes of its ids and, if any
+    row is new or changed, one executemany upsert per set of source columns.
+    Unchanged rows are never written. A changed row only updates the columns
+    its record carries (CSV header or JSON keys), and leaves LIVE_COLUMNS
+    such as products' stock alone unless `update_live` is set. With
+    `update_existing=False` only ids missing from the table are inserted.
+    """
+    model = MODELS[kind]
+    table = model.__table__
+    columns = [column for column in table.columns if column.name not in _MANAGED_COLUMNS]
+    names = [column.name for column in columns]
+    converters = [(column.name, _converter(column)) for column in columns]
+    live = set() if update_live else LIVE_COLUMNS.get(kind, set())
+    upserts: Dict[FrozenSet[str], object] = {}
+    counts = {"read": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        rows: Dict[int, Dict] = {}
+        sources: Dict[int, FrozenSet[str]] = {}
+        for record in batch:
+            values = [convert(record.get(name)) for name, convert in converters]
+            row = dict(zip(names, values))
+            if row["id"] is None:
+                raise ValueError(f"{kind} record without an id: {record!r}")
+            row["content_hash"] = content_hash(values)
+            rows[row["id"]] = row
+            sources[row["id"]] = frozenset(name for name in names if name in record and name not in live)
+        counts["read"] += len(batch)
+
+        stored = dict(db.execute(select(table.c.id, table.c.content_hash).where(table.c.id.in_(rows))).all())
+        now = datetime.utcnow()
+        changed: Dict[FrozenSet[str], List[Dict]] = defaultdict(list)
+        for row_id, row in rows.items():
+            if row_id not in stored:
+                counts["inserted"] += 1
+            elif update_existing and stored[row_id] != row["content_hash"]:
+                counts["updated"] += 1
+            else:
+                continue
+            changed[sources[row_id]].append({**row, "created_at": now, "updated_at": now})
+        counts["unchanged"] += len(rows) - sum(len(group) for group in changed.values())
+
+        for source_columns, group in changed.items():
+            if source_columns not in upserts:
+                upserts[source_columns] = _upsert_statement(
+                    db, table, [name for name in names if name in source_columns]
+                )
+            db.execute(upserts[source_columns], group)
+        if changed:
+            change_events.mark_reload(db, table.name)
+        db.commit()
+
+    if counts["inserted"] and db.get_bind().dialect.name == "postgresql":
+        # Rows carry explicit ids; move the serial past them so ORM inserts
+        # don't collide.
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+        db.commit()
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load catalog rows from a JSONL or CSV file.")
+    parser.add_argument("kind", choices=sorted(MODELS))
+    parser.add_argument("path", help="JSONL file (one object per line) or CSV file with a header row")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--update-live", action="store_true", help="also overwrite live columns such as products' stock"
+    )
+    args = parser.parse_args(argv)
+
+    from app.db.bootstrap import bootstrap_database
+    from app.db.database import SessionLocal, engine
+
+    bootstrap_database(engine)
+    started = datetime.utcnow()
+    with SessionLocal() as db:
+        counts = load_records(
+            db, args.kind, iter_records(args.path), args.batch_size, update_live=args.update_live
+        )
+        if args.kind in ("figures", "events") and (counts["inserted"] or counts["updated"]):
+            from app.services.figure_links import rebuild_links
+
+            counts["links_changed"] = rebuild_links(db)
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    print(
+        f"{args.kind}: read {counts['read']}, inserted {counts['inserted']}, "
+        f"updated {counts['updated']}, unchanged {counts['unchanged']}, "
+        f"links changed {counts.get('links_changed', 0)} in {elapsed:.1f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
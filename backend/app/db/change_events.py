@@ -0,0 +1,84 @@
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# A change is (action, table name, column snapshot). Actions are "insert",
+# "update" and "delete" for ORM flushes, and "reload" when a table changed
+# outside the ORM (bulk statements or another worker) and must be re-read.
+Change = Tuple[str, str, Dict]
+Listener = Callable[[List[Change]], None]
+
+_listeners: Dict[str, List[Listener]] = defaultdict(list)
+_PENDING_KEY = "pending_changes"
+
+
+def on_commit(tablename: str, listener: Listener) -> None:
+    """Call `listener` with the committed changes to `tablename`."""
+    _listeners[tablename].append(listener)
+
+
+def notify_reload(tablename: str) -> None:
+    """Tell listeners that `tablename` changed without ORM events."""
+    _dispatch([("reload", tablename, {})])
+
+
+def mark_reload(session: Session, tablename: str) -> None:
+    """Queue a "reload" for `tablename` to be sent when `session` commits.
+
+    Use after bulk statements, which don't produce ORM flush events.
+    """
+    session.info.setdefault(_PENDING_KEY, []).append(("reload", tablename, {}))
+
+
+def mark_updated(session: Session, tablename: str, ids) -> None:
+    """Queue an "update" carrying only the primary key of each row in `ids`.
+
+    Use after bulk statements that change known rows, so listeners can drop
+    just those rows instead of reloading the whole table.
+    """
+    session.info.setdefault(_PENDING_KEY, []).extend(("update", tablename, {"id": row_id}) for row_id in ids)
+
+
+def _dispatch(changes: List[Change]) -> None:
+    by_table: Dict[str, List[Change]] = defaultdict(list)
+    for change in changes:
+        by_table[change[1]].append(change)
+    for tablename, table_changes in by_table.items():
+        for listener in _listeners.get(tablename, ()):
+            listener(table_changes)
+
+
+def _snapshot(obj) -> Dict:
+    # Only loaded attributes are included; an update to an expired instance
+    # carries just the columns that were set.
+    state = obj.__dict__
+    snapshot = {attr.key: state[attr.key] for attr in obj.__mapper__.column_attrs if attr.key in state}
+    identity = inspect(obj).identity
+    if identity:
+        for column, value in zip(obj.__mapper__.primary_key, identity):
+            snapshot.setdefault(column.key, value)
+    return snapshot
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for action, objects in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            tablename = getattr(obj, "__tablename__", None)
+            if tablename in _listeners:
+                pending.append((action, tablename, _snapshot(obj)))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        _dispatch(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -1,24 +1,198 @@
 import os
+import time
+from typing import Dict, Optional
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql.dml import UpdateBase
+from starlette.requests import Request
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./black_excellence.db")
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+# After a successful write, the client reads from the primary for this long
+# so it never sees a replica that hasn't caught up with its own change. The
+# pin travels both as a cookie, for same-site clients, and as a header
+# carrying the deadline, which the frontend echoes back on every request.
+READ_YOUR_WRITES_COOKIE = "db_primary"
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+READ_YOUR_WRITES_SECONDS = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (asyncpg / aiosqlite)."""
+    for prefix in ("postgresql://", "postgres://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict:
+    """Pool and connection settings for an engine on `url`."""
+    options = {"pool_pre_ping": True}
+    if url.startswith("sqlite"):
+        if not is_async:
+            options["connect_args"] = {"check_same_thread": False}
+        return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    )
+    if url.startswith("postgres") and DB_STATEMENT_TIMEOUT_MS > 0:
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+ASYNC_DATABASE_READ_URL = os.getenv(
+    "ASYNC_DATABASE_READ_URL", async_database_url(DATABASE_READ_URL) if DATABASE_READ_URL else None
+)
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+read_engine = create_engine(DATABASE_READ_URL, **engine_options(DATABASE_READ_URL)) if DATABASE_READ_URL else engine
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+async_read_engine = (
+    create_async_engine(ASYNC_DATABASE_READ_URL, **engine_options(ASYNC_DATABASE_READ_URL, is_async=True))
+    if ASYNC_DATABASE_READ_URL
+    else async_engine
+)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica when `info["use_replica"]`
+    is set, and flushes and DML statements to the primary."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("use_replica") and not self._flushing and not isinstance(clause, UpdateBase):
+            return self.info["replica"]
+        return self.info["primary"]
 
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(
+    class_=RoutingSession, autoflush=False, info={"primary": engine, "replica": read_engine}
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    info={"primary": async_engine.sync_engine, "replica": async_read_engine.sync_engine},
+)
 Base = declarative_base()
 
 
+def _pinned_by_header(request: Request) -> bool:
+    try:
+        deadline = float(request.headers.get(READ_YOUR_WRITES_HEADER, ""))
+    except ValueError:
+        return False
+    # Deadlines further out than a write could have set are ignored.
+    return 0 < deadline - time.time() <= READ_YOUR_WRITES_SECONDS
+
+
+def use_replica(request: Request) -> bool:
+    return (
+        request.method in SAFE_METHODS
+        and READ_YOUR_WRITES_COOKIE not in request.cookies
+        and not _pinned_by_header(request)
+    )
+
+
+def reads_from_replica(db) -> bool:
+    """Whether `db`, a session from a read session factory, sends its reads
+    to a separate replica rather than the primary."""
+    info = db.info
+    return bool(info.get("use_replica")) and info.get("replica") is not info.get("primary")
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request):
+    db = ReadSessionLocal()
+    db.info["use_replica"] = use_replica(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    async with AsyncReadSessionLocal() as db:
+        db.info["use_replica"] = use_replica(request)
+        yield db
+
+
+class ReadYourWritesMiddleware:
+    """Sets a short-lived cookie and a deadline header on responses to
+    successful writes, which pin the client's following reads to the primary."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        cookie = f"{READ_YOUR_WRITES_COOKIE}=1; Max-Age={READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                deadline = f"{time.time() + READ_YOUR_WRITES_SECONDS:.3f}"
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"set-cookie", cookie.encode()),
+                    (READ_YOUR_WRITES_HEADER.lower().encode(), deadline.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def _pool_stats(bound: Engine) -> Dict:
+    pool = bound.pool
+    stats: Dict[str, Optional[int]] = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        stats[name] = getattr(pool, name)() if hasattr(pool, name) else None
+    return stats
+
+
+def pool_stats() -> Dict:
+    """Connection pool utilization for every engine the API uses."""
+    stats = {"primary": _pool_stats(engine), "async_primary": _pool_stats(async_engine.sync_engine)}
+    if read_engine is not engine:
+        stats["replica"] = _pool_stats(read_engine)
+    if async_read_engine is not async_engine:
+        stats["async_replica"] = _pool_stats(async_read_engine.sync_engine)
+    return stats
@@ -1,25 +1,68 @@
+import json
 import os
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, Header, HTTPException, Request, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from openai import OpenAI
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, ConfigDict
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from jose import jwt, JWTError
-import uvicorn
-import stripe
-
-from app.db.database import Base, engine, get_db
-from app.db.seed_catalog import seed_catalog
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.db.bootstrap import bootstrap_database
+from app.db.database import (
+    READ_YOUR_WRITES_HEADER,
+    ReadYourWritesMiddleware,
+    SessionLocal,
+    async_engine,
+    async_read_engine,
+    engine,
+    get_async_read_db,
+    get_db,
+    get_read_db,
+    pool_stats,
+    read_engine,
+)
 from app.models.user import User
 from app.models.catalog import HistoricalFigure as HistoricalFigureDB
 from app.models.catalog import HistoricalEvent as HistoricalEventDB
 from app.models.catalog import Product as ProductDB
+from app.models.catalog import FigureEventLink
 from app.models.commerce import CartItem, Order, OrderItem
+from app.models.rate_limit import RateLimitBucket  # noqa: F401
+from app.models.schema_meta import SchemaMeta  # noqa: F401
+from app.services.ai_cache import CompletionCache, completion_cache
+from app.services.ai_chat import ai_api_key, close_client, complete, completion_params, stream_completion
+from app.services.auth_cache import AuthenticatedUser, auth_cache
+from app.services.catalog_cache import catalog_cache
+from app.services.fieldsets import Fields, field_selection, sparse_json, sparse_select
+from app.services.figure_links import figure_links
+from app.services.hot_inventory import hot_inventory
+from app.services.http_cache import MARKETPLACE_CACHE_CONTROL, conditional_response
+from app.services.inventory import reserve_stock
+from app.services.pagination import (
+    MAX_PAGE_SIZE,
+    PageParams,
+    decode_offset,
+    encode_cursor,
+    paginate_by_id,
+    paginate_newest_first,
+    set_next_cursor,
+)
+from app.services.passwords import password_hasher
+from app.services.product_facets import product_facets
+from app.services.product_search import search_products
+from app.services.rate_limit import RateLimiter, build_rate_limit_backend
+from app.services.row_blobs import row_blobs
+from app.services.search_index import search_index
+from app.services.stripe_webhooks import StripeWebhookWorker, store_event
+from app.services.year_index import year_index
 
 app = FastAPI(
     title="Black Excellence History API",
@@ -34,11 +77,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "ETag", READ_YOUR_WRITES_HEADER],
 )
+app.add_middleware(ReadYourWritesMiddleware)
 
 load_dotenv()
 
-NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY")
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
@@ -46,27 +90,42 @@ STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
-if STRIPE_SECRET_KEY:
-    stripe.api_key = STRIPE_SECRET_KEY
+_stripe = None
 
-# Initialize OpenAI client only if API key is provided
-ai_client = None
-if NVIDIA_API_KEY and NVIDIA_API_KEY != "placeholder_nvidia_api_key":
-    ai_client = OpenAI(
-        base_url="https://integrate.api.nvidia.com/v1",
-        api_key=NVIDIA_API_KEY,
-    )
 
-Base.metadata.create_all(bind=engine)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def stripe_sdk():
+    """Import and configure the Stripe SDK on first use; it is slow to import."""
+    global _stripe
+    if _stripe is None:
+        import stripe
+
+        if STRIPE_SECRET_KEY:
+            stripe.api_key = STRIPE_SECRET_KEY
+        _stripe = stripe
+    return _stripe
 
 
 @app.on_event("startup")
 def startup_event():
-    Base.metadata.create_all(bind=engine)
-    db = next(get_db())
-    seed_catalog(db)
-    db.close()
+    bootstrap_database(engine)
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    stripe_webhook_worker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stripe_webhook_worker.stop()
+    await close_client()
+    password_hasher.shutdown()
+    await run_in_threadpool(hot_inventory.flush)
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+    if read_engine is not engine:
+        read_engine.dispose()
 
 
 class HistoricalFigure(BaseModel):
@@ -93,6 +152,11 @@ class HistoricalEvent(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+# ?view=summary: what list views render, without the long text columns.
+figure_fields = field_selection(HistoricalFigure, summary=("id", "name", "category", "image_url"))
+event_fields = field_selection(HistoricalEvent, summary=("id", "title", "year", "location"))
+
+
 class ChatRequest(BaseModel):
     message: str
     temperature: float = 0.2
@@ -145,6 +209,105 @@ class Product(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+row_blobs.register(HistoricalFigureDB, lambda row: HistoricalFigure.model_validate(row).model_dump(mode="json"))
+row_blobs.register(HistoricalEventDB, lambda row: HistoricalEvent.model_validate(row).model_dump(mode="json"))
+row_blobs.register(ProductDB, lambda row: Product.model_validate(row).model_dump(mode="json"))
+
+
+def blob_generation(db: AsyncSession, tablename: str) -> Optional[int]:
+    """The row-blob generation to cache rows read through `db` under, or
+    None while its replica may still lag a local commit to `tablename`."""
+    return row_blobs.generation(tablename) if catalog_cache.settled(db, [tablename]) else None
+
+
+def catalog_response(request: Request, body: bytes, models) -> Response:
+    last_modified = catalog_cache.last_modified([model.__tablename__ for model in models])
+    if ProductDB in models:
+        return conditional_response(request, body, last_modified, MARKETPLACE_CACHE_CONTROL)
+    return conditional_response(request, body, last_modified)
+
+
+def page_response(request: Request, page: Tuple[bytes, Optional[str]], models) -> Response:
+    body, next_cursor = page
+    response = catalog_response(request, body, models)
+    set_next_cursor(response, request, next_cursor)
+    return response
+
+
+async def related_response(request: Request, db: AsyncSession, model, row_id: int, not_found: str, related) -> Response:
+    """Rows of `related` linked to `model` row `row_id` through figure_event_links."""
+    columns = {HistoricalFigureDB: FigureEventLink.figure_id, HistoricalEventDB: FigureEventLink.event_id}
+    link_column, related_column = columns[model], columns[related]
+
+    async def build() -> bytes:
+        await figure_links.ensure_fresh()
+        if await db.scalar(select(model.id).where(model.id == row_id)) is None:
+            raise HTTPException(status_code=404, detail=not_found)
+        generation = blob_generation(db, related.__tablename__)
+        result = await db.execute(
+            select(related)
+            .join(FigureEventLink, related_column == related.id)
+            .where(link_column == row_id)
+            .order_by(related.id)
+        )
+        return row_blobs.join(result.scalars().all(), generation)
+
+    models = [HistoricalFigureDB, HistoricalEventDB]
+    body = await catalog_cache.get_or_build_async(db, f"related:{model.__tablename__}:{row_id}", models, build)
+    return catalog_response(request, body, models)
+
+
+def check_year_range(from_year: Optional[int], to_year: Optional[int]) -> None:
+    if from_year is not None and to_year is not None and from_year > to_year:
+        raise HTTPException(status_code=400, detail="from_year must not be after to_year")
+
+
+async def row_response(
+    request: Request, db: AsyncSession, model, row_id: int, not_found: str, *criteria
+) -> Response:
+    """Serve one catalog row from its cached blob, querying only on a miss."""
+    await catalog_cache.revalidate_async(db, model)
+    tablename = model.__tablename__
+    body = row_blobs.get(tablename, row_id)
+    if body is None:
+        generation = blob_generation(db, tablename)
+        row = await db.scalar(select(model).where(model.id == row_id, *criteria))
+        if row is None:
+            raise HTTPException(status_code=404, detail=not_found)
+        body = row_blobs.blob(row, generation)
+    return catalog_response(request, body, [model])
+
+
+def parse_id_list(name: str, value: Optional[str]) -> List[int]:
+    """Parse a comma-separated id list, keeping the first occurrence of each id."""
+    if not value:
+        return []
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a comma-separated list of ids")
+    if len(ids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PAGE_SIZE} {name} per request")
+    return ids
+
+
+async def batch_rows(db: AsyncSession, model, ids: List[int], *criteria) -> bytes:
+    """A JSON object of `ids` to cached row blobs, with null for missing rows.
+
+    Cached rows cost nothing; the rest are loaded with a single IN query.
+    """
+    await catalog_cache.revalidate_async(db, model)
+    tablename = model.__tablename__
+    blobs = {row_id: row_blobs.get(tablename, row_id) for row_id in ids}
+    missing = [row_id for row_id, blob in blobs.items() if blob is None]
+    if missing:
+        generation = blob_generation(db, tablename)
+        result = await db.execute(select(model).where(model.id.in_(missing), *criteria))
+        for row in result.scalars():
+            blobs[row.id] = row_blobs.blob(row, generation)
+    return b"{" + b",".join(b'"%d":%s' % (row_id, blob or b"null") for row_id, blob in blobs.items()) + b"}"
+
+
 class CartItemResponse(BaseModel):
     id: int
     quantity: int
@@ -206,119 +369,357 @@ PLANS: List[Dict] = [
     },
 ]
 
+# Per-plan token buckets, keyed by subscription tier (the lowercased plan name).
+PLAN_RATE_LIMITS: Dict[str, Dict[str, Dict[str, float]]] = {
+    "free": {
+        "ai": {"burst": 5, "per_minute": 5},
+        "checkout": {"burst": 5, "per_minute": 5},
+    },
+    "basic": {
+        "ai": {"burst": 20, "per_minute": 30},
+        "checkout": {"burst": 10, "per_minute": 20},
+    },
+    "premium": {
+        "ai": {"burst": 60, "per_minute": 120},
+        "checkout": {"burst": 20, "per_minute": 60},
+    },
+}
+
+stripe_webhook_worker = StripeWebhookWorker(SessionLocal)
+
+rate_limiter = RateLimiter(build_rate_limit_backend(engine), PLAN_RATE_LIMITS)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
+    from jose import jwt
+
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)) -> Dict:
+def get_current_user(
+    authorization: Optional[str] = Header(None), db: Session = Depends(get_db)
+) -> AuthenticatedUser:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-    token = authorization.split(" ", 1)[1]
+    return _user_from_token(authorization.split(" ", 1)[1], db)
+
+
+def get_optional_user(
+    authorization: Optional[str] = Header(None), db: Session = Depends(get_db)
+) -> Optional[AuthenticatedUser]:
+    """The caller for a valid bearer token, else None. An expired or invalid
+    token is treated like no token, so anonymous-capable routes keep working."""
+    if not authorization:
+        return None
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-    except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        return get_current_user(authorization, db)
+    except HTTPException as exc:
+        if exc.status_code != status.HTTP_401_UNAUTHORIZED:
+            raise
+        return None
+
+
+def _user_from_token(token: str, db: Session) -> AuthenticatedUser:
+    user_id = auth_cache.get_token(token)
+    if user_id is None:
+        from jose import JWTError, jwt
+
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user_id = int(payload.get("sub"))
+        except (JWTError, TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        auth_cache.put_token(token, user_id, float(payload.get("exp") or 0))
+
+    user = auth_cache.get_user(user_id)
+    if user is None:
+        row = db.query(User).filter(User.id == user_id).first()
+        if not row:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user = AuthenticatedUser.from_orm(row)
+        auth_cache.put_user(user)
+    if user.is_active is False:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User is inactive")
     return user
 
 
+def stock_available(product: ProductDB) -> int:
+    """Units a buyer can get: the row's stock plus, for a hot item, the
+    units this worker has leased from it and not yet sold."""
+    return (product.stock_quantity or 0) + hot_inventory.held(product.id)
+
+
+def stock_shortfall_message(shortfalls: List[Dict], products: Dict[int, ProductDB]) -> str:
+    parts = []
+    for shortfall in shortfalls:
+        product = products.get(shortfall["product_id"])
+        name = product.name if product else f"product {shortfall['product_id']}"
+        parts.append(f"{name} (requested {shortfall['requested']}, available {shortfall['available'] or 0})")
+    return "Not enough stock for " + "; ".join(parts)
+
+
+def ai_rate_limit(request: Request, user: Optional[AuthenticatedUser] = Depends(get_optional_user)) -> None:
+    if user:
+        rate_limiter.check("ai", f"user:{user.id}", user.subscription_tier)
+    else:
+        rate_limiter.check("ai", f"ip:{request.client.host if request.client else 'unknown'}", None)
+
+
+def checkout_rate_limit(current_user: User = Depends(get_current_user)) -> None:
+    rate_limiter.check("checkout", f"user:{current_user.id}", current_user.subscription_tier)
+
+
 @app.get("/")
 def read_root():
     return {"message": "Black Excellence History API", "version": "1.0.0"}
 
 
 @app.get("/api/figures", response_model=List[HistoricalFigure])
-def get_figures(db: Session = Depends(get_db)):
-    return db.query(HistoricalFigureDB).all()
+async def get_figures(
+    request: Request,
+    page: PageParams = Depends(),
+    fields: Fields = Depends(figure_fields),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """All figures by id; `fields` or `view=summary` return only some fields."""
+
+    async def build() -> Tuple[bytes, Optional[str]]:
+        generation = blob_generation(db, HistoricalFigureDB.__tablename__)
+        stmt = sparse_select(HistoricalFigureDB, fields) if fields else select(HistoricalFigureDB)
+        rows, next_cursor = await paginate_by_id(db, stmt, HistoricalFigureDB, page)
+        body = sparse_json(rows, fields) if fields else row_blobs.join(rows, generation)
+        return body, next_cursor
+
+    key = f"figures:{page.cache_key}:{','.join(fields or ())}"
+    return page_response(request, await catalog_cache.get_or_build_async(db, key, [HistoricalFigureDB], build), [HistoricalFigureDB])
 
 
 @app.get("/api/figures/{figure_id}", response_model=HistoricalFigure)
-def get_figure(figure_id: int, db: Session = Depends(get_db)):
-    figure = db.query(HistoricalFigureDB).filter(HistoricalFigureDB.id == figure_id).first()
-    if not figure:
-        raise HTTPException(status_code=404, detail="Figure not found")
-    return figure
+async def get_figure(request: Request, figure_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    return await row_response(request, db, HistoricalFigureDB, figure_id, "Figure not found")
+
+
+@app.get("/api/figures/{figure_id}/events", response_model=List[HistoricalEvent])
+async def get_figure_events(request: Request, figure_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    return await related_response(request, db, HistoricalFigureDB, figure_id, "Figure not found", HistoricalEventDB)
 
 
 @app.get("/api/events", response_model=List[HistoricalEvent])
-def get_events(db: Session = Depends(get_db)):
-    return db.query(HistoricalEventDB).all()
+async def get_events(
+    request: Request,
+    from_year: Optional[int] = None,
+    to_year: Optional[int] = None,
+    page: PageParams = Depends(),
+    fields: Fields = Depends(event_fields),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """All events by id, or with a year range, events in (year, id) order.
+    `fields` or `view=summary` return only some fields."""
+
+    async def build() -> Tuple[bytes, Optional[str]]:
+        generation = blob_generation(db, HistoricalEventDB.__tablename__)
+        stmt = sparse_select(HistoricalEventDB, fields) if fields else select(HistoricalEventDB)
+        if from_year is None and to_year is None:
+            rows, next_cursor = await paginate_by_id(db, stmt, HistoricalEventDB, page)
+        else:
+            await year_index.ensure_loaded(db)
+            ids, next_cursor = year_index.page(from_year, to_year, page)
+            result = await db.execute(stmt.where(HistoricalEventDB.id.in_(ids)))
+            by_id = {row.id: row for row in result.scalars()}
+            rows = [by_id[event_id] for event_id in ids if event_id in by_id]
+        body = sparse_json(rows, fields) if fields else row_blobs.join(rows, generation)
+        return body, next_cursor
+
+    check_year_range(from_year, to_year)
+    key = f"events:{from_year}:{to_year}:{page.cache_key}:{','.join(fields or ())}"
+    body = await catalog_cache.get_or_build_async(db, key, [HistoricalEventDB], build)
+    return page_response(request, body, [HistoricalEventDB])
+
+
+@app.get("/api/timeline")
+async def get_timeline(
+    request: Request,
+    group: str = Query("decade", pattern="^(decade|century)$"),
+    from_year: Optional[int] = None,
+    to_year: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    async def build() -> bytes:
+        await year_index.ensure_loaded(db)
+        buckets = year_index.timeline(from_year, to_year, group)
+        return json.dumps({"group": group, "total": sum(b["count"] for b in buckets), "buckets": buckets}).encode()
+
+    check_year_range(from_year, to_year)
+    key = f"timeline:{group}:{from_year}:{to_year}"
+    body = await catalog_cache.get_or_build_async(db, key, [HistoricalEventDB], build)
+    return catalog_response(request, body, [HistoricalEventDB])
 
 
 @app.get("/api/events/{event_id}", response_model=HistoricalEvent)
-def get_event(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(HistoricalEventDB).filter(HistoricalEventDB.id == event_id).first()
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    return event
+async def get_event(request: Request, event_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    return await row_response(request, db, HistoricalEventDB, event_id, "Event not found")
+
+
+@app.get("/api/events/{event_id}/figures", response_model=List[HistoricalFigure])
+async def get_event_figures(request: Request, event_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    return await related_response(request, db, HistoricalEventDB, event_id, "Event not found", HistoricalFigureDB)
 
 
 @app.get("/api/categories")
-def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(HistoricalFigureDB.category).distinct().all()
-    categories_flat = [c[0] for c in categories if c[0]]
-    return {"categories": categories_flat}
+async def get_categories(request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    async def build() -> bytes:
+        categories = await db.execute(select(HistoricalFigureDB.category).distinct())
+        categories_flat = [c[0] for c in categories if c[0]]
+        return json.dumps({"categories": categories_flat}).encode()
+
+    body = await catalog_cache.get_or_build_async(db, "figure-categories", [HistoricalFigureDB], build)
+    return catalog_response(request, body, [HistoricalFigureDB])
+
+
+@app.get("/api/batch")
+async def get_batch(
+    request: Request,
+    figures: Optional[str] = None,
+    events: Optional[str] = None,
+    products: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Several figures, events and products in one request, e.g.
+    /api/batch?figures=1,2&events=3. Each requested type maps ids to rows,
+    with null for ids that don't exist."""
+    requested = [
+        ("figures", HistoricalFigureDB, parse_id_list("figures", figures), ()),
+        ("events", HistoricalEventDB, parse_id_list("events", events), ()),
+        ("products", ProductDB, parse_id_list("products", products), (ProductDB.is_active == True,)),
+    ]
+    requested = [entry for entry in requested if entry[2]]
+    if not requested:
+        raise HTTPException(status_code=400, detail="Request at least one of figures, events or products")
+
+    parts = []
+    for name, model, ids, criteria in requested:
+        parts.append(b'"%s":%s' % (name.encode(), await batch_rows(db, model, ids, *criteria)))
+    body = b"{" + b",".join(parts) + b"}"
+    return catalog_response(request, body, [model for _, model, _, _ in requested])
+
+
+@app.get("/api/search")
+def search_catalog(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[str] = Query(None, alias="type", pattern="^(figure|event)$"),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    catalog_cache.revalidate(db, HistoricalFigureDB)
+    catalog_cache.revalidate(db, HistoricalEventDB)
+    kinds = [kind] if kind else ["figure", "event"]
+    offset = decode_offset(page)
+    total, results = search_index.search(db, q, kinds, page.limit, offset)
+    next_cursor = encode_cursor({"offset": offset + page.limit}) if offset + page.limit < total else None
+    return {"query": q, "total": total, "results": results, "next_cursor": next_cursor}
+
+
+@app.post("/api/ai/chat", dependencies=[Depends(ai_rate_limit)])
+async def chat_with_ai(payload: ChatRequest):
+    if not ai_api_key():
+        raise HTTPException(status_code=500, detail="NVIDIA_API_KEY is not configured on the server.")
+
+    params = completion_params(
+        payload.message, payload.temperature, payload.top_p, payload.max_tokens, payload.thinking
+    )
+    cache_key = CompletionCache.make_key(
+        payload.message, payload.temperature, payload.top_p, payload.max_tokens, payload.thinking
+    )
+    return {"response": await complete(params, cache_key)}
 
 
-@app.post("/api/ai/chat")
-def chat_with_ai(payload: ChatRequest):
-    if not NVIDIA_API_KEY or not ai_client:
+@app.post("/api/ai/chat/stream", dependencies=[Depends(ai_rate_limit)])
+async def stream_chat_with_ai(payload: ChatRequest, request: Request):
+    if not ai_api_key():
         raise HTTPException(status_code=500, detail="NVIDIA_API_KEY is not configured on the server.")
 
-    try:
-        completion = ai_client.chat.completions.create(
-            model="deepseek-ai/deepseek-v3.1",
-            messages=[{"role": "user", "content": payload.message}],
-            temperature=payload.temperature,
-            top_p=payload.top_p,
-            max_tokens=payload.max_tokens,
-            extra_body={"chat_template_kwargs": {"thinking": payload.thinking}},
-        )
-        content = completion.choices[0].message.content
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"AI request failed: {exc}")
+    params = completion_params(
+        payload.message, payload.temperature, payload.top_p, payload.max_tokens, payload.thinking
+    )
+    cache_key = CompletionCache.make_key(
+        payload.message, payload.temperature, payload.top_p, payload.max_tokens, payload.thinking
+    )
+    return StreamingResponse(
+        stream_completion(request, params, cache_key),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/ai/cache/stats")
+def ai_cache_stats():
+    return completion_cache.stats()
 
-    return {"response": content}
+
+@app.get("/api/metrics")
+def get_metrics():
+    return {
+        "ai_cache": completion_cache.stats(),
+        "password_hashing": password_hasher.stats(),
+        "database_pools": pool_stats(),
+    }
 
 
+# Register and login are async so that a burst of them waits for bcrypt on
+# the event loop instead of tying up the threadpool other sync routes need;
+# only their short database steps run on worker threads.
 @app.post("/api/auth/register")
-def register_user(payload: UserCreate, db: Session = Depends(get_db)):
-    existing_email = db.query(User).filter(User.email == payload.email).first()
-    if existing_email:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    existing_username = db.query(User).filter(User.username == payload.username).first()
-    if existing_username:
-        raise HTTPException(status_code=400, detail="Username already taken")
-
-    hashed_password = pwd_context.hash(payload.password)
-    user = User(
-        email=payload.email,
-        username=payload.username,
-        hashed_password=hashed_password,
-        full_name=payload.full_name,
-        subscription_tier="free",
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+async def register_user(payload: UserCreate, db: Session = Depends(get_db)):
+    def check_available() -> None:
+        existing_email = db.query(User).filter(User.email == payload.email).first()
+        if existing_email:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        existing_username = db.query(User).filter(User.username == payload.username).first()
+        if existing_username:
+            raise HTTPException(status_code=400, detail="Username already taken")
+
+    def insert_user(hashed_password: str) -> int:
+        user = User(
+            email=payload.email,
+            username=payload.username,
+            hashed_password=hashed_password,
+            full_name=payload.full_name,
+            subscription_tier="free",
+        )
+        db.add(user)
+        db.commit()
+        return user.id
+
+    await run_in_threadpool(check_available)
+    user_id = await run_in_threadpool(insert_user, await password_hasher.hash(payload.password))
 
-    token = create_access_token({"sub": user.id})
+    token = create_access_token({"sub": str(user_id)})
     return {"access_token": token, "token_type": "bearer"}
 
 
 @app.post("/api/auth/login")
-def login_user(payload: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == payload.username).first()
-    if not user or not pwd_context.verify(payload.password, user.hashed_password):
+async def login_user(payload: UserLogin, db: Session = Depends(get_db)):
+    def find_user() -> Optional[User]:
+        return db.query(User).filter(User.username == payload.username).first()
+
+    def store_hash(user: User, new_hash: str) -> None:
+        user.hashed_password = new_hash
+        db.commit()
+
+    user = await run_in_threadpool(find_user)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
+    user_id = user.id  # read now; the commit in store_hash expires it
+    verified, new_hash = await password_hasher.verify(payload.password, user.hashed_password)
+    if not verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
-    token = create_access_token({"sub": user.id})
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made; upgrade it in place.
+        await run_in_threadpool(store_hash, user, new_hash)
+    token = create_access_token({"sub": str(user_id)})
     return {"access_token": token, "token_type": "bearer"}
 
 
@@ -334,47 +735,74 @@ def get_me(current_user: User = Depends(get_current_user)):
 
 
 @app.get("/api/marketplace/products", response_model=List[Product])
-def list_products(category: Optional[str] = None, search: Optional[str] = None, db: Session = Depends(get_db)):
-    query = db.query(ProductDB).filter(ProductDB.is_active == True)
-    if category:
-        query = query.filter(ProductDB.category.ilike(category))
-    if search:
-        term = f"%{search.lower()}%"
-        query = query.filter(
-            ProductDB.name.ilike(term) | ProductDB.description.ilike(term)
-        )
-    return query.all()
+async def list_products(
+    request: Request,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    async def build() -> Tuple[bytes, Optional[str]]:
+        generation = blob_generation(db, ProductDB.__tablename__)
+        if search:
+            rows, next_cursor = await search_products(db, search, category, page)
+        else:
+            stmt = select(ProductDB).where(ProductDB.is_active == True)
+            if category:
+                stmt = stmt.where(ProductDB.category.ilike(category))
+            rows, next_cursor = await paginate_by_id(db, stmt, ProductDB, page)
+        return row_blobs.join(rows, generation), next_cursor
+
+    key = f"products:{(category or '').lower()}:{(search or '').lower()}:{page.cache_key}"
+    return page_response(request, await catalog_cache.get_or_build_async(db, key, [ProductDB], build), [ProductDB])
+
+
+@app.get("/api/marketplace/browse")
+async def browse_products(
+    request: Request,
+    category: List[str] = Query([]),
+    tag: List[str] = Query([]),
+    price: List[str] = Query([]),
+    availability: List[str] = Query([]),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Active products matching every facet (any of the values given for
+    each), with per-value counts for all facets."""
+    filters = {"category": category, "tags": tag, "price": price, "availability": availability}
+
+    async def build() -> Tuple[bytes, Optional[str]]:
+        await product_facets.ensure_fresh(db)
+        generation = blob_generation(db, ProductDB.__tablename__)
+        ids, total, facets, next_cursor = product_facets.browse(filters, page)
+        result = await db.execute(select(ProductDB).where(ProductDB.id.in_(ids)))
+        by_id = {row.id: row for row in result.scalars()}
+        products = row_blobs.join([by_id[product_id] for product_id in ids if product_id in by_id], generation)
+        head = json.dumps({"total": total, "facets": facets})[:-1].encode()
+        return head + b', "products": ' + products + b"}", next_cursor
+
+    key = "browse:" + json.dumps({facet: sorted(values) for facet, values in filters.items()}) + page.cache_key
+    body = await catalog_cache.get_or_build_async(db, key, [ProductDB], build)
+    return page_response(request, body, [ProductDB])
 
 
 @app.get("/api/marketplace/products/{product_id}", response_model=Product)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = (
-        db.query(ProductDB)
-        .filter(ProductDB.id == product_id, ProductDB.is_active == True)
-        .first()
-    )
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+async def get_product(request: Request, product_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    return await row_response(request, db, ProductDB, product_id, "Product not found", ProductDB.is_active == True)
 
 
-@app.post("/api/marketplace/products/{product_id}/purchase")
+@app.post("/api/marketplace/products/{product_id}/purchase", dependencies=[Depends(checkout_rate_limit)])
 def purchase_product(product_id: int, current_user: Dict = Depends(get_current_user), db: Session = Depends(get_db)):
-    product = (
-        db.query(ProductDB)
-        .filter(ProductDB.id == product_id, ProductDB.is_active == True)
-        .with_for_update()
-        .first()
-    )
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    if product.stock_quantity <= 0:
+    shortfalls, _ = reserve_stock(db, {product_id: 1})
+    if shortfalls:
+        if shortfalls[0]["available"] is None:
+            raise HTTPException(status_code=404, detail="Product not found")
         raise HTTPException(status_code=400, detail="Out of stock")
 
-    product.stock_quantity -= 1
     db.commit()
-    db.refresh(product)
-    return {"message": "Order created", "remaining_stock": product.stock_quantity}
+    remaining = db.query(ProductDB.stock_quantity).filter(ProductDB.id == product_id).scalar()
+    remaining += hot_inventory.held(product_id)
+    return {"message": "Order created", "remaining_stock": remaining}
 
 
 @app.get("/api/subscriptions/plans", response_model=List[SubscriptionPlan])
@@ -397,10 +825,13 @@ def select_plan(plan_id: int, current_user: User = Depends(get_current_user), db
 
 
 @app.get("/api/marketplace/categories")
-def get_marketplace_categories(db: Session = Depends(get_db)):
-    categories = db.query(ProductDB.category).filter(ProductDB.is_active == True).distinct().all()
-    categories_flat = [c[0] for c in categories if c[0]]
-    return {"categories": categories_flat}
+async def get_marketplace_categories(request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    async def build() -> bytes:
+        await product_facets.ensure_fresh(db)
+        return json.dumps({"categories": product_facets.categories()}).encode()
+
+    body = await catalog_cache.get_or_build_async(db, "product-categories", [ProductDB], build)
+    return catalog_response(request, body, [ProductDB])
 
 
 @app.get("/api/cart", response_model=List[CartItemResponse])
@@ -448,10 +879,10 @@ def add_to_cart(
     )
     if not product:
         raise HTTPException(status_code=404, detail="Product not found or inactive")
-    if product.stock_quantity < quantity:
+    if stock_available(product) < quantity:
         raise HTTPException(
             status_code=400,
-            detail=f"Only {product.stock_quantity} items available in stock",
+            detail=f"Only {stock_available(product)} items available in stock",
         )
 
     cart_item = (
@@ -461,10 +892,10 @@ def add_to_cart(
     )
     if cart_item:
         new_quantity = cart_item.quantity + quantity
-        if product.stock_quantity < new_quantity:
+        if stock_available(product) < new_quantity:
             raise HTTPException(
                 status_code=400,
-                detail=f"Only {product.stock_quantity} items available in stock",
+                detail=f"Only {stock_available(product)} items available in stock",
             )
         cart_item.quantity = new_quantity
     else:
@@ -511,10 +942,10 @@ def update_cart_item(
         db.commit()
         raise HTTPException(status_code=200, detail="Item removed")
 
-    if cart_item.product.stock_quantity < quantity:
+    if stock_available(cart_item.product) < quantity:
         raise HTTPException(
             status_code=400,
-            detail=f"Only {cart_item.product.stock_quantity} items available in stock",
+            detail=f"Only {stock_available(cart_item.product)} items available in stock",
         )
 
     cart_item.quantity = quantity
@@ -547,7 +978,25 @@ def remove_cart_item(
     return {"message": "Item removed"}
 
 
-@app.post("/api/orders", response_model=OrderResponse)
+def insert_order_items(db: Session, order_id: int, cart_items: List[CartItem]) -> List[Dict]:
+    """Insert one order item per cart item with a single executemany and
+    return the inserted values. Adding OrderItem objects instead would cost
+    one INSERT per item, since the ORM fetches each new primary key."""
+    rows = [
+        {
+            "order_id": order_id,
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "unit_price": item.product.price or 0,
+            "subtotal": (item.product.price or 0) * item.quantity,
+        }
+        for item in cart_items
+    ]
+    db.execute(insert(OrderItem), rows)
+    return rows
+
+
+@app.post("/api/orders", response_model=OrderResponse, dependencies=[Depends(checkout_rate_limit)])
 def create_order(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     cart_items = (
         db.query(CartItem)
@@ -557,58 +1006,51 @@ def create_order(current_user: User = Depends(get_current_user), db: Session = D
     if not cart_items:
         raise HTTPException(status_code=400, detail="Cart is empty")
 
-    total = 0.0
+    products = {item.product_id: item.product for item in cart_items}
+    lines: Dict[int, int] = defaultdict(int)
     for item in cart_items:
-        if item.product.stock_quantity < item.quantity:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Not enough stock for {item.product.name}",
-            )
-
-    order = Order(user_id=current_user.id, status="pending", total_amount=0.0)
+        lines[item.product_id] += item.quantity
+    shortfalls, from_lease = reserve_stock(db, lines)
+    if shortfalls:
+        raise HTTPException(status_code=400, detail=stock_shortfall_message(shortfalls, products))
+    # Keep the loaded products in step with the UPDATE without reloading them.
+    # Lines served from leased hot stock didn't update their rows.
+    for product_id, quantity in lines.items():
+        if product_id in from_lease:
+            continue
+        product = products[product_id]
+        set_committed_value(product, "stock_quantity", product.stock_quantity - quantity)
+
+    total = sum((item.product.price or 0) * item.quantity for item in cart_items)
+    order = Order(user_id=current_user.id, status="pending", total_amount=total)
     db.add(order)
     db.flush()  # get order.id
 
-    order_items: List[OrderItem] = []
-    for item in cart_items:
-        subtotal = (item.product.price or 0) * item.quantity
-        total += subtotal
-        oi = OrderItem(
-            order_id=order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            unit_price=item.product.price or 0,
-            subtotal=subtotal,
-        )
-        order_items.append(oi)
-        item.product.stock_quantity -= item.quantity
-        db.add(oi)
-
-    order.total_amount = total
+    order_items = insert_order_items(db, order.id, cart_items)
     db.query(CartItem).filter(CartItem.user_id == current_user.id).delete()
-    db.commit()
-    db.refresh(order)
 
-    items_response = [
-        OrderItemResponse(
-            product=oi.product,
-            quantity=oi.quantity,
-            unit_price=oi.unit_price,
-            subtotal=oi.subtotal,
-        )
-        for oi in order_items
-    ]
-
-    return OrderResponse(
+    # Build the response from the rows already in memory; after commit they
+    # would be expired and reloaded one by one.
+    response = OrderResponse(
         id=order.id,
         status=order.status,
         total_amount=order.total_amount,
         created_at=order.created_at,
-        items=items_response,
+        items=[
+            OrderItemResponse(
+                product=item.product,
+                quantity=oi["quantity"],
+                unit_price=oi["unit_price"],
+                subtotal=oi["subtotal"],
+            )
+            for item, oi in zip(cart_items, order_items)
+        ],
     )
+    db.commit()
+    return response
 
 
-@app.post("/api/checkout/session")
+@app.post("/api/checkout/session", dependencies=[Depends(checkout_rate_limit)])
 def create_checkout_session(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     if not STRIPE_SECRET_KEY:
         raise HTTPException(status_code=503, detail="Stripe is not configured.")
@@ -625,7 +1067,7 @@ def create_checkout_session(current_user: User = Depends(get_current_user), db:
     total = 0.0
     line_items = []
     for item in cart_items:
-        if item.product.stock_quantity < item.quantity:
+        if stock_available(item.product) < item.quantity:
             raise HTTPException(
                 status_code=400,
                 detail=f"Not enough stock for {item.product.name}",
@@ -647,7 +1089,7 @@ def create_checkout_session(current_user: User = Depends(get_current_user), db:
         )
 
     try:
-        session = stripe.checkout.Session.create(
+        session = stripe_sdk().checkout.Session.create(
             payment_method_types=["card"],
             mode="payment",
             line_items=line_items,
@@ -668,16 +1110,7 @@ def create_checkout_session(current_user: User = Depends(get_current_user), db:
     db.add(order)
     db.flush()
 
-    for item in cart_items:
-        subtotal = (item.product.price or 0) * item.quantity
-        oi = OrderItem(
-            order_id=order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            unit_price=item.product.price or 0,
-            subtotal=subtotal,
-        )
-        db.add(oi)
+    insert_order_items(db, order.id, cart_items)
 
     # Do NOT clear cart here; clear on successful payment webhook
     db.commit()
@@ -687,54 +1120,45 @@ def create_checkout_session(current_user: User = Depends(get_current_user), db:
 
 
 @app.post("/api/stripe/webhook")
-async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
+async def stripe_webhook(request: Request):
     payload = await request.body()
     sig_header = request.headers.get("stripe-signature")
     if not STRIPE_WEBHOOK_SECRET:
         raise HTTPException(status_code=500, detail="Webhook secret not configured.")
 
     try:
-        event = stripe.Webhook.construct_event(
+        event = stripe_sdk().Webhook.construct_event(
             payload, sig_header, STRIPE_WEBHOOK_SECRET
         )
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"Webhook error: {exc}")
 
-    if event["type"] == "checkout.session.completed":
-        session_obj = event["data"]["object"]
-        session_id = session_obj.get("id")
-        payment_intent = session_obj.get("payment_intent")
-
-        order = (
-            db.query(Order)
-            .filter(Order.stripe_checkout_session_id == session_id)
-            .first()
-        )
-        if order and order.status != "completed":
-            order.status = "completed"
-            order.stripe_payment_intent_id = payment_intent
-
-            # decrement stock for each order item
-            for oi in order.items:
-                product = db.query(ProductDB).filter(ProductDB.id == oi.product_id).first()
-                if product:
-                    product.stock_quantity = max(product.stock_quantity - oi.quantity, 0)
+    # Persist and acknowledge; the worker applies the event off the request path.
+    await run_in_threadpool(_store_stripe_event, event, payload)
+    stripe_webhook_worker.wake()
+    return {"status": "ok"}
 
-            # clear cart for user
-            db.query(CartItem).filter(CartItem.user_id == order.user_id).delete()
-            db.commit()
 
-    return {"status": "ok"}
+def _store_stripe_event(event, payload: bytes) -> None:
+    db = SessionLocal()
+    try:
+        store_event(db, event, payload)
+    finally:
+        db.close()
 
 
 @app.get("/api/orders", response_model=List[OrderResponse])
-def list_orders(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    orders = (
-        db.query(Order)
-        .filter(Order.user_id == current_user.id)
-        .order_by(Order.created_at.desc())
-        .all()
+def list_orders(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    orders, next_cursor = paginate_newest_first(
+        db.query(Order).filter(Order.user_id == current_user.id), Order, page
     )
+    set_next_cursor(response, request, next_cursor)
     results: List[OrderResponse] = []
     for order in orders:
         items_resp = [
@@ -759,4 +1183,6 @@ def list_orders(current_user: User = Depends(get_current_user), db: Session = De
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Boolean, Column, DateTime, Float, Integer, JSON, String, Text
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, JSON, String, Text
 
 from app.db.database import Base
 
@@ -19,6 +19,7 @@ class HistoricalFigure(Base):
     is_featured = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    content_hash = Column(String(32))
 
 
 class HistoricalEvent(Base):
@@ -26,7 +27,7 @@ class HistoricalEvent(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
-    year = Column(Integer)
+    year = Column(Integer, index=True)
     description = Column(Text)
     significance = Column(Text)
     location = Column(String)
@@ -34,6 +35,7 @@ class HistoricalEvent(Base):
     is_featured = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    content_hash = Column(String(32))
 
 
 class Product(Base):
@@ -49,5 +51,18 @@ class Product(Base):
     tags = Column(JSON)
     is_active = Column(Boolean, default=True)
     stock_quantity = Column(Integer, default=0)
+    # Sold from per-worker leased stock (app.services.hot_inventory) instead
+    # of locking the row on every purchase; for flash sales.
+    is_hot_item = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    content_hash = Column(String(32))
+
+
+class FigureEventLink(Base):
+    """A figure named in an event's key_figures, matched by normalized name."""
+
+    __tablename__ = "figure_event_links"
+
+    figure_id = Column(Integer, ForeignKey("historical_figures.id", ondelete="CASCADE"), primary_key=True)
+    event_id = Column(Integer, ForeignKey("historical_events.id", ondelete="CASCADE"), primary_key=True, index=True)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
@@ -15,11 +15,15 @@ class CartItem(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    product = relationship("Product")
+    product = relationship("Product", lazy="joined")
 
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Backs newest-first keyset pagination of a user's order history.
+        Index("ix_orders_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False, index=True)
@@ -29,7 +33,7 @@ class Order(Base):
     stripe_payment_intent_id = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    items = relationship("OrderItem", back_populates="order")
+    items = relationship("OrderItem", back_populates="order", lazy="selectin")
 
 
 class OrderItem(Base):
@@ -43,4 +47,20 @@ class OrderItem(Base):
     subtotal = Column(Float, nullable=False)
 
     order = relationship("Order", back_populates="items")
-    product = relationship("Product")
+    product = relationship("Product", lazy="joined")
+
+
+class StripeEvent(Base):
+    """Inbox of verified Stripe webhook events, keyed by Stripe's event id so
+    redelivered events are stored once and processed once."""
+
+    __tablename__ = "stripe_events"
+
+    id = Column(String, primary_key=True)
+    type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(String, default="pending", index=True)  # pending, processed, failed
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
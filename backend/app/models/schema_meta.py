@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String
+
+from app.db.database import Base
+
+
+class SchemaMeta(Base):
+    __tablename__ = "schema_meta"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
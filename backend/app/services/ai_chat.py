@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+from fastapi import HTTPException, Request
+
+from app.services.ai_cache import completion_cache
+
+AI_BASE_URL = os.getenv("AI_BASE_URL", "https://integrate.api.nvidia.com/v1")
+AI_MODEL = os.getenv("AI_MODEL", "deepseek-ai/deepseek-v3.1")
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "64"))
+AI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", "32"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "16"))
+AI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AI_QUEUE_TIMEOUT_SECONDS", "10"))
+AI_REQUEST_TIMEOUT_SECONDS = float(os.getenv("AI_REQUEST_TIMEOUT_SECONDS", "60"))
+
+
+class _LoopState:
+    """Client, semaphore and in-flight calls bound to one event loop.
+
+    httpx pools and asyncio primitives can't be shared across loops, so they
+    are created lazily on first use inside the serving loop.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        from openai import AsyncOpenAI  # slow to import; only needed once AI chat is used
+
+        self.loop = loop
+        self.client = AsyncOpenAI(
+            base_url=AI_BASE_URL,
+            api_key=ai_api_key(),
+            max_retries=1,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=AI_MAX_CONNECTIONS,
+                    max_keepalive_connections=AI_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=30.0,
+                ),
+                timeout=httpx.Timeout(AI_REQUEST_TIMEOUT_SECONDS, connect=5.0),
+            ),
+        )
+        self.semaphore = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+        self.inflight: Dict[str, asyncio.Task] = {}
+
+
+_state: Optional[_LoopState] = None
+
+
+def ai_api_key() -> Optional[str]:
+    key = os.getenv("NVIDIA_API_KEY")
+    if not key or key == "placeholder_nvidia_api_key":
+        return None
+    return key
+
+
+def _loop_state() -> _LoopState:
+    global _state
+    loop = asyncio.get_running_loop()
+    if _state is None or _state.loop is not loop:
+        _state = _LoopState(loop)
+    return _state
+
+
+async def close_client() -> None:
+    global _state
+    if _state is not None:
+        await _state.client.close()
+        _state = None
+
+
+def completion_params(
+    message: str, temperature: float, top_p: float, max_tokens: int, thinking: bool
+) -> Dict:
+    return {
+        "model": AI_MODEL,
+        "messages": [{"role": "user", "content": message}],
+        "temperature": temperature,
+        "top_p": top_p,
+        "max_tokens": max_tokens,
+        "extra_body": {"chat_template_kwargs": {"thinking": thinking}},
+    }
+
+
+async def _acquire_slot(state: _LoopState) -> None:
+    try:
+        await asyncio.wait_for(state.semaphore.acquire(), AI_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="The historian is busy, please try again shortly.",
+            headers={"Retry-After": "5"},
+        )
+
+
+async def _request_completion(state: _LoopState, params: Dict, cache_key: str) -> str:
+    await _acquire_slot(state)
+    try:
+        completion = await asyncio.wait_for(
+            state.client.chat.completions.create(**params), AI_REQUEST_TIMEOUT_SECONDS
+        )
+        content = completion.choices[0].message.content
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="AI request timed out")
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"AI request failed: {exc}")
+    finally:
+        state.semaphore.release()
+    completion_cache.set(cache_key, content)
+    return content
+
+
+def _forget(state: _LoopState, cache_key: str, task: asyncio.Task) -> None:
+    if state.inflight.get(cache_key) is task:
+        del state.inflight[cache_key]
+    if not task.cancelled():
+        task.exception()  # mark retrieved even if every waiter went away
+
+
+async def complete(params: Dict, cache_key: str) -> str:
+    """Return a completion, from cache or upstream.
+
+    Identical concurrent prompts share a single upstream call; a waiter that
+    is cancelled does not cancel the call for the others.
+    """
+    content = completion_cache.get(cache_key)
+    if content is not None:
+        return content
+
+    state = _loop_state()
+    task = state.inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_request_completion(state, params, cache_key))
+        state.inflight[cache_key] = task
+        task.add_done_callback(lambda t: _forget(state, cache_key, t))
+    return await asyncio.shield(task)
+
+
+def sse_event(data) -> str:
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    return f"data: {data}\n\n"
+
+
+async def stream_completion(request: Request, params: Dict, cache_key: Optional[str] = None) -> AsyncIterator[str]:
+    """Forward completion tokens as Server-Sent Events.
+
+    The upstream stream is closed as soon as the client goes away, either when
+    Starlette cancels this generator or when a disconnect is noticed between
+    chunks, so abandoned chats stop consuming upstream capacity. Cached
+    answers are replayed as a single chunk, and fully streamed answers are
+    stored under `cache_key`.
+    """
+    if cache_key:
+        cached = completion_cache.get(cache_key)
+        if cached is not None:
+            yield sse_event({"delta": cached})
+            yield sse_event("[DONE]")
+            return
+
+    state = _loop_state()
+    try:
+        await _acquire_slot(state)
+    except HTTPException as exc:
+        yield sse_event({"error": exc.detail})
+        return
+
+    try:
+        try:
+            stream = await asyncio.wait_for(
+                state.client.chat.completions.create(stream=True, **params), AI_REQUEST_TIMEOUT_SECONDS
+            )
+        except Exception as exc:
+            yield sse_event({"error": f"AI request failed: {exc}"})
+            return
+
+        parts = []
+        try:
+            async for chunk in stream:
+                if await request.is_disconnected():
+                    return
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield sse_event({"delta": delta})
+            if cache_key:
+                completion_cache.set(cache_key, "".join(parts))
+            yield sse_event("[DONE]")
+        except Exception as exc:
+            yield sse_event({"error": f"AI request failed: {exc}"})
+        finally:
+            await stream.close()
+    finally:
+        state.semaphore.release()
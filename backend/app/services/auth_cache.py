@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.db import change_events
+
+
+class AuthenticatedUser:
+    """Detached snapshot of the `users` columns the API reads for the caller."""
+
+    __slots__ = ("id", "email", "username", "full_name", "subscription_tier", "is_active")
+
+    def __init__(self, id, email, username, full_name, subscription_tier, is_active):
+        self.id = id
+        self.email = email
+        self.username = username
+        self.full_name = full_name
+        self.subscription_tier = subscription_tier
+        self.is_active = is_active
+
+    @classmethod
+    def from_orm(cls, user) -> "AuthenticatedUser":
+        return cls(user.id, user.email, user.username, user.full_name, user.subscription_tier, user.is_active)
+
+
+class AuthCache:
+    """Verified JWTs and recently loaded users, so repeat requests with the
+    same token skip both signature checks and the users query.
+
+    Users are held for a short TTL and dropped as soon as a commit in this
+    process touches their row; the TTL bounds staleness across workers.
+    """
+
+    def __init__(self, user_ttl: float = 30.0, max_entries: int = 10000):
+        self.user_ttl = user_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._tokens: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._users: "OrderedDict[int, Tuple[float, AuthenticatedUser]]" = OrderedDict()
+
+    def _get(self, entries: OrderedDict, key):
+        with self._lock:
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del entries[key]
+                return None
+            entries.move_to_end(key)
+            return entry[1]
+
+    def _put(self, entries: OrderedDict, key, expires_at: float, value) -> None:
+        with self._lock:
+            entries[key] = (expires_at, value)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def get_token(self, token: str) -> Optional[int]:
+        return self._get(self._tokens, token)
+
+    def put_token(self, token: str, user_id: int, expires_at: float) -> None:
+        self._put(self._tokens, token, expires_at, user_id)
+
+    def get_user(self, user_id: int) -> Optional[AuthenticatedUser]:
+        return self._get(self._users, user_id)
+
+    def put_user(self, user: AuthenticatedUser) -> None:
+        self._put(self._users, user.id, time.time() + self.user_ttl, user)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+    def _on_change(self, changes) -> None:
+        for action, _, row in changes:
+            if action == "reload":
+                self.clear()
+            elif "id" in row:
+                self.invalidate_user(row["id"])
+
+
+auth_cache = AuthCache(
+    user_ttl=float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30")),
+    max_entries=int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")),
+)
+
+change_events.on_commit("users", auth_cache._on_change)
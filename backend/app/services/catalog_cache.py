@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db import change_events
+from app.db.database import READ_YOUR_WRITES_SECONDS, reads_from_replica
+from app.models.catalog import HistoricalEvent, HistoricalFigure, Product
+
+CATALOG_MODELS = (HistoricalFigure, HistoricalEvent, Product)
+_CATALOG_TABLES = {model.__tablename__: model for model in CATALOG_MODELS}
+_PROBES_KEY = "catalog_cache_probes"
+
+
+def _probe(db: Session, model) -> Tuple:
+    return tuple(db.execute(select(func.max(model.updated_at), func.count(model.id))).one())
+
+
+class CatalogCache:
+    """Pre-serialized responses for the read-mostly catalog tables.
+
+    Every entry is stamped with the version of the tables it was built from.
+    Versions are bumped when a commit in this process touches a table, and
+    every `revalidate_seconds` a cheap max(updated_at)/count(*) probe catches
+    changes made by other workers or outside the ORM. A local write
+    transaction probes each catalog table it writes just before its first
+    write, so changes that landed before it still signal a reload, and
+    stores the probe taken just before its commit as the new baseline, so
+    its own writes don't.
+
+    For READ_YOUR_WRITES_SECONDS after a local commit, results read from a
+    replica are served but not cached: the replica may not have the commit
+    yet, and caching its rows under the new version would hand them to the
+    writer's own primary-pinned reads as well.
+    """
+
+    def __init__(self, revalidate_seconds: float = 10.0, max_entries: int = 512):
+        self.revalidate_seconds = revalidate_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._tokens: Dict[str, Tuple] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._committed_at: Dict[str, datetime] = {}
+        self._entries: "OrderedDict[str, Tuple[Tuple, Any]]" = OrderedDict()
+
+    def bump(self, tablename: str) -> None:
+        with self._lock:
+            self._versions[tablename] = self._versions.get(tablename, 0) + 1
+
+    def version(self, tablenames: Sequence[str]) -> Tuple:
+        with self._lock:
+            return tuple(self._versions.get(name, 0) for name in tablenames)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key: str, version: Tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, version: Tuple, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def settled(self, db, tablenames: Sequence[str]) -> bool:
+        """False while `db` reads from a replica that may still lag this
+        worker's latest commit to one of `tablenames`."""
+        if not reads_from_replica(db):
+            return True
+        since = datetime.utcnow() - timedelta(seconds=READ_YOUR_WRITES_SECONDS)
+        with self._lock:
+            committed = [self._committed_at.get(name) for name in tablenames]
+        return all(at is None or at <= since for at in committed)
+
+    def due_for_revalidation(self, tablename: str) -> bool:
+        return time.monotonic() - self._checked_at.get(tablename, 0.0) >= self.revalidate_seconds
+
+    def record_token(self, tablename: str, token: Tuple) -> None:
+        """Store the latest max(updated_at)/count probe for `tablename`."""
+        with self._lock:
+            previous = self._tokens.get(tablename)
+            self._tokens[tablename] = token
+            self._checked_at[tablename] = time.monotonic()
+        if previous is not None and previous != token:
+            change_events.notify_reload(tablename)
+
+    def set_token(self, tablename: str, token: Tuple) -> None:
+        """Store `token` as the baseline without signalling a reload."""
+        with self._lock:
+            self._tokens[tablename] = token
+            self._checked_at[tablename] = time.monotonic()
+
+    def last_modified(self, tablenames: Sequence[str]) -> Optional[datetime]:
+        """Latest max(updated_at) seen by the probes for `tablenames`, or
+        the time of this worker's last commit to them if that is later."""
+        with self._lock:
+            stamps = [self._tokens[name][0] for name in tablenames if name in self._tokens]
+            stamps += [self._committed_at.get(name) for name in tablenames]
+        stamps = [stamp for stamp in stamps if stamp is not None]
+        return max(stamps) if stamps else None
+
+    def revalidate(self, db: Session, model) -> None:
+        tablename = model.__tablename__
+        if not self.due_for_revalidation(tablename):
+            return
+        self.record_token(tablename, _probe(db, model))
+
+    async def revalidate_async(self, db: AsyncSession, model) -> None:
+        tablename = model.__tablename__
+        if not self.due_for_revalidation(tablename):
+            return
+        result = await db.execute(select(func.max(model.updated_at), func.count(model.id)))
+        self.record_token(tablename, tuple(result.one()))
+
+    async def get_or_build_async(
+        self, db: AsyncSession, key: str, models: Sequence, build: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        for model in models:
+            await self.revalidate_async(db, model)
+        tablenames = [model.__tablename__ for model in models]
+        version = self.version(tablenames)
+        value = self.get(key, version)
+        if value is None:
+            value = await build()
+            if self.settled(db, tablenames):
+                self.put(key, version, value)
+        return value
+
+    def _on_change(self, changes) -> None:
+        for tablename in {change[1] for change in changes}:
+            self.bump(tablename)
+            with self._lock:
+                self._committed_at[tablename] = datetime.utcnow()
+
+
+catalog_cache = CatalogCache(
+    revalidate_seconds=float(os.getenv("CATALOG_CACHE_REVALIDATE_SECONDS", "10")),
+    max_entries=int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "512")),
+)
+
+for _model in CATALOG_MODELS:
+    change_events.on_commit(_model.__tablename__, catalog_cache._on_change)
+
+
+def _probe_before_write(session: Session, tablename: str) -> None:
+    probes = session.info.setdefault(_PROBES_KEY, set())
+    if tablename in probes:
+        return
+    probes.add(tablename)
+    with session.no_autoflush:
+        catalog_cache.record_token(tablename, _probe(session, _CATALOG_TABLES[tablename]))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _probe_before_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if getattr(table, "name", None) in _CATALOG_TABLES:
+            _probe_before_write(orm_execute_state.session, table.name)
+
+
+@event.listens_for(Session, "before_flush")
+def _probe_before_flush(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tablename = getattr(obj, "__tablename__", None)
+        if tablename in _CATALOG_TABLES:
+            _probe_before_write(session, tablename)
+
+
+@event.listens_for(Session, "before_commit")
+def _probe_before_commit(session):
+    session.flush()  # so the before-write probes include the final flush
+    if not session.info.get(_PROBES_KEY):
+        return
+    with session.no_autoflush:
+        session.info[_PROBES_KEY] = {
+            tablename: _probe(session, _CATALOG_TABLES[tablename]) for tablename in session.info[_PROBES_KEY]
+        }
+
+
+@event.listens_for(Session, "after_commit")
+def _store_committed_probes(session):
+    probes = session.info.pop(_PROBES_KEY, None)
+    if isinstance(probes, dict):
+        for tablename, token in probes.items():
+            catalog_cache.set_token(tablename, token)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_probes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PROBES_KEY, None)
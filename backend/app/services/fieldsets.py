@@ -0,0 +1,48 @@
+from typing import Callable, Optional, Sequence, Tuple, Type
+
+import orjson
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+
+Fields = Optional[Tuple[str, ...]]
+
+
+def field_selection(schema: Type[BaseModel], summary: Sequence[str]) -> Callable[..., Fields]:
+    """Build a dependency for `?fields=a,b` and `?view=summary` on a list of
+    `schema` objects.
+
+    It returns the selected field names in schema order, always including
+    `id` (the pagination key), or None for the full objects.
+    """
+    known = list(schema.model_fields)
+
+    def dependency(
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name"),
+        view: Optional[str] = Query(None, pattern="^(full|summary)$"),
+    ) -> Fields:
+        if fields:
+            wanted = {name.strip() for name in fields.split(",") if name.strip()}
+            unknown = sorted(wanted - set(known))
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(known)}",
+                )
+        elif view == "summary":
+            wanted = set(summary)
+        else:
+            return None
+        return tuple(name for name in known if name == "id" or name in wanted)
+
+    return dependency
+
+
+def sparse_select(model, fields: Tuple[str, ...]):
+    """SELECT `model` loading only `fields`; every other column is deferred."""
+    return select(model).options(load_only(*(getattr(model, name) for name in fields)))
+
+
+def sparse_json(rows, fields: Tuple[str, ...]) -> bytes:
+    return orjson.dumps([{name: getattr(row, name) for name in fields} for row in rows])
@@ -0,0 +1,139 @@
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.db import change_events
+from app.db.database import SessionLocal
+from app.models.catalog import FigureEventLink, HistoricalEvent, HistoricalFigure
+
+# Titles and suffixes that vary between how a figure is named in their own
+# record and in event key_figures ("Dr. Martin Luther King Jr." vs "Martin
+# Luther King Jr.").
+HONORIFICS = {
+    "dr", "rev", "reverend", "mr", "mrs", "ms", "miss", "sir", "dame", "madam", "madame",
+    "prof", "professor", "hon", "jr", "sr", "ii", "iii", "iv",
+}
+
+_links = FigureEventLink.__table__
+
+_delete_link_stmt = delete(_links).where(
+    _links.c.figure_id == bindparam("link_figure_id"), _links.c.event_id == bindparam("link_event_id")
+)
+
+
+def normalize_name(name: str) -> List[str]:
+    """Name tokens without accents, punctuation, parentheticals or honorifics."""
+    name = re.sub(r"\(.*?\)", " ", name)
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    return [token for token in re.findall(r"[a-z0-9]+", name) if token not in HONORIFICS]
+
+
+class _NameMatcher:
+    """Resolves free-text names to figure ids.
+
+    A name matches on all of its tokens, or failing that on its first and
+    last token ("Martin King"); ambiguous names don't match at all.
+    """
+
+    def __init__(self, figures: List[Tuple[int, str]]):
+        self.full: Dict[Tuple[str, ...], Set[int]] = defaultdict(set)
+        self.short: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        for figure_id, name in figures:
+            tokens = normalize_name(name or "")
+            if tokens:
+                self.full[tuple(tokens)].add(figure_id)
+                self.short[(tokens[0], tokens[-1])].add(figure_id)
+
+    def match(self, name: str) -> Optional[int]:
+        tokens = normalize_name(name)
+        if not tokens:
+            return None
+        for candidates in (self.full.get(tuple(tokens)), self.short.get((tokens[0], tokens[-1]))):
+            if candidates and len(candidates) == 1:
+                return next(iter(candidates))
+        return None
+
+
+def rebuild_links(db: Session) -> int:
+    """Recompute figure_event_links from the catalog and return how many
+    links were added or removed; unchanged links are not rewritten.
+
+    Every worker rebuilds on its own, so two may apply the same difference
+    at once: links another worker already added are skipped, and deleting
+    one it already removed matches no row.
+    """
+    matcher = _NameMatcher(db.execute(select(HistoricalFigure.id, HistoricalFigure.name)).all())
+    wanted: Set[Tuple[int, int]] = set()
+    for event_id, key_figures in db.execute(select(HistoricalEvent.id, HistoricalEvent.key_figures)):
+        for name in key_figures or []:
+            figure_id = matcher.match(str(name))
+            if figure_id is not None:
+                wanted.add((figure_id, event_id))
+
+    existing = set(db.execute(select(_links.c.figure_id, _links.c.event_id)).all())
+    stale = existing - wanted
+    added = wanted - existing
+    if stale:
+        db.execute(_delete_link_stmt, [{"link_figure_id": f, "link_event_id": e} for f, e in sorted(stale)])
+    if added:
+        insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        db.execute(
+            insert(_links).on_conflict_do_nothing(index_elements=["figure_id", "event_id"]),
+            [{"figure_id": f, "event_id": e} for f, e in sorted(added)],
+        )
+    db.commit()
+    return len(stale) + len(added)
+
+
+class FigureLinks:
+    """Keeps figure_event_links in step with the catalog.
+
+    Commits to figures or events (and reloads detected by the catalog probe)
+    mark the links dirty; the next related-content lookup rebuilds them
+    before reading.
+    """
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()  # held for the whole rebuild
+        self._flag_lock = threading.Lock()
+        self._dirty = False
+        self._generation = 0
+
+    def mark_dirty(self) -> None:
+        with self._flag_lock:
+            self._dirty = True
+            self._generation += 1
+
+    def _rebuild(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            # Changes marked while the rebuild runs keep the links dirty.
+            generation = self._generation
+            with self.session_factory() as db:
+                rebuild_links(db)
+            with self._flag_lock:
+                if self._generation == generation:
+                    self._dirty = False
+
+    async def ensure_fresh(self) -> None:
+        # While a rebuild is running, wait for it rather than read the old links.
+        if self._dirty or self._lock.locked():
+            await run_in_threadpool(self._rebuild)
+
+    def _on_change(self, changes) -> None:
+        self.mark_dirty()
+
+
+figure_links = FigureLinks(SessionLocal)
+
+for _model in (HistoricalFigure, HistoricalEvent):
+    change_events.on_commit(_model.__tablename__, figure_links._on_change)
@@ -0,0 +1,222 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import bindparam, create_engine, event, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import change_events
+from app.db.database import DATABASE_URL, engine_options
+from app.models.catalog import Product
+
+logger = logging.getLogger(__name__)
+
+HOT_ITEM_LEASE_SIZE = int(os.getenv("HOT_ITEM_LEASE_SIZE", "20"))
+HOT_ITEM_REFRESH_SECONDS = float(os.getenv("HOT_ITEM_REFRESH_SECONDS", "30"))
+HOT_ITEM_LEASE_POOL_SIZE = int(os.getenv("HOT_ITEM_LEASE_POOL_SIZE", "2"))
+
+_products = Product.__table__
+_TAKEN_KEY = "hot_stock_taken"
+
+# Moves a chunk of stock from the row into this worker's ledger. Like
+# reserve_stock, the WHERE clause only lets it succeed while enough stock is
+# left, so the row never goes negative and the chunks leased by every worker
+# never add up to more than the stock there was.
+_lease_stmt = (
+    update(_products)
+    .where(
+        _products.c.id == bindparam("lease_id"),
+        _products.c.is_active == True,
+        _products.c.is_hot_item == True,
+        _products.c.stock_quantity >= bindparam("lease_qty"),
+    )
+    .values(stock_quantity=_products.c.stock_quantity - bindparam("lease_qty"))
+)
+
+_return_stmt = (
+    update(_products)
+    .where(_products.c.id == bindparam("lease_id"))
+    .values(stock_quantity=_products.c.stock_quantity + bindparam("lease_qty"))
+)
+
+
+class HotInventory:
+    """In-process stock ledger for products flagged `is_hot_item`.
+
+    Every purchase of an ordinary product updates its row, and buyers of the
+    same product queue on that row lock until each transaction commits. For
+    hot items this worker instead leases stock from the row in chunks of
+    `lease_size` with one short conditional UPDATE, committed on its own, and
+    sells from the lease in memory. A flash sale of N units then costs about
+    N / lease_size row updates instead of N.
+
+    Leased units are already gone from `stock_quantity`, so no two workers
+    can sell the same unit and nothing is oversold. The cost is that a
+    product's stored stock excludes units leased but not yet sold, and that
+    a worker may report a product sold out while another still holds its
+    last few units; keep the lease small. Units are given back to the ledger
+    when the buying transaction rolls back, and to the row when the product
+    stops being hot and on shutdown. A worker that dies holding a lease
+    loses those units (undersell, never oversell).
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], lease_size: int = HOT_ITEM_LEASE_SIZE):
+        self._session_factory = session_factory
+        self.lease_size = max(1, lease_size)
+        self._lock = threading.Lock()
+        self._product_locks: Dict[int, threading.Lock] = {}
+        self._leases: Dict[int, int] = {}
+        self._hot: Set[int] = set()
+        self._loaded_at: Optional[float] = None
+
+    def hot_ids(self, db: Session) -> Set[int]:
+        """Ids of the active products currently flagged as hot items."""
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < HOT_ITEM_REFRESH_SECONDS:
+                return self._hot
+        hot = set(db.scalars(select(Product.id).where(Product.is_hot_item == True, Product.is_active == True)))
+        with self._lock:
+            dropped = self._hot - hot
+            self._hot, self._loaded_at = hot, time.monotonic()
+        for product_id in dropped:
+            self.return_lease(product_id)
+        return hot
+
+    def take(self, db: Session, lines: Dict[int, int]) -> List[Dict]:
+        """Take `lines` ({product_id: quantity}) of hot items out of the ledger.
+
+        Either every line is taken and an empty list is returned, or nothing
+        is and the first short line is returned as a shortfall. Taken units
+        are handed back if `db`'s transaction rolls back instead of committing.
+        """
+        db.connection()  # join the caller's transaction so its end settles the units
+        taken: Dict[int, int] = {}
+        for product_id, quantity in sorted(lines.items()):
+            available = self._take_one(product_id, quantity)
+            if available is not None:
+                self.give_back(taken)
+                return [{"product_id": product_id, "requested": quantity, "available": available}]
+            taken[product_id] = quantity
+        pending = db.info.setdefault(_TAKEN_KEY, {})
+        for product_id, quantity in taken.items():
+            pending[product_id] = pending.get(product_id, 0) + quantity
+        return []
+
+    def _take_one(self, product_id: int, quantity: int) -> Optional[int]:
+        """Take `quantity` units, leasing more if needed; the units on hand if short."""
+        with self._lock:
+            product_lock = self._product_locks.setdefault(product_id, threading.Lock())
+        with product_lock:
+            with self._lock:
+                held = self._leases.get(product_id, 0)
+            if held < quantity:
+                held += self._lease(product_id, max(self.lease_size, quantity - held))
+            with self._lock:
+                if held < quantity:
+                    self._leases[product_id] = held
+                    return held
+                self._leases[product_id] = held - quantity
+                return None
+
+    def _lease(self, product_id: int, wanted: int) -> int:
+        """Move up to `wanted` units from the product row into the ledger."""
+        with self._session_factory() as db:
+            for _ in range(3):
+                stock = db.scalar(
+                    select(Product.stock_quantity).where(
+                        Product.id == product_id, Product.is_active == True, Product.is_hot_item == True
+                    )
+                )
+                if not stock:
+                    return 0
+                quantity = min(wanted, stock)
+                if db.execute(_lease_stmt, {"lease_id": product_id, "lease_qty": quantity}).rowcount:
+                    change_events.mark_updated(db, Product.__tablename__, [product_id])
+                    db.commit()
+                    return quantity
+                # Another worker leased in between; look again.
+                db.rollback()
+        return 0
+
+    def give_back(self, lines: Dict[int, int]) -> None:
+        """Return units taken from the ledger but not sold."""
+        with self._lock:
+            for product_id, quantity in lines.items():
+                self._leases[product_id] = self._leases.get(product_id, 0) + quantity
+
+    def held(self, product_id: int) -> int:
+        with self._lock:
+            return self._leases.get(product_id, 0)
+
+    def return_lease(self, product_id: int) -> None:
+        """Put the unsold units of `product_id`'s lease back on its row."""
+        with self._lock:
+            product_lock = self._product_locks.setdefault(product_id, threading.Lock())
+        with product_lock:
+            with self._lock:
+                quantity = self._leases.pop(product_id, 0)
+            if not quantity:
+                return
+            try:
+                with self._session_factory() as db:
+                    db.execute(_return_stmt, {"lease_id": product_id, "lease_qty": quantity})
+                    change_events.mark_updated(db, Product.__tablename__, [product_id])
+                    db.commit()
+            except Exception:
+                logger.exception("Could not return %s leased units of product %s", quantity, product_id)
+                self.give_back({product_id: quantity})
+
+    def flush(self) -> None:
+        """Return every unsold leased unit to the database."""
+        with self._lock:
+            product_ids = list(self._leases)
+        for product_id in product_ids:
+            self.return_lease(product_id)
+
+    def _on_change(self, changes) -> None:
+        # Flags set by an admin or the catalog loader are picked up on the
+        # next purchase rather than after HOT_ITEM_REFRESH_SECONDS.
+        if any(action != "update" or "is_hot_item" in row or "is_active" in row for action, _, row in changes):
+            with self._lock:
+                self._loaded_at = None
+
+
+# Leases commit on their own while the buyer's request still holds its
+# connection. Taking them from the request pool could leave every pooled
+# connection held by a buyer waiting on a lease, so they get a small pool of
+# their own, created on the first lease so that workers selling no hot items
+# don't hold any connections for it.
+_lease_sessions: Optional[sessionmaker] = None
+_lease_sessions_lock = threading.Lock()
+
+
+def _lease_session() -> Session:
+    global _lease_sessions
+    with _lease_sessions_lock:
+        if _lease_sessions is None:
+            options = engine_options(DATABASE_URL)
+            if "pool_size" in options:
+                options.update(pool_size=HOT_ITEM_LEASE_POOL_SIZE, max_overflow=0)
+            _lease_sessions = sessionmaker(bind=create_engine(DATABASE_URL, **options), autoflush=False)
+    return _lease_sessions()
+
+
+hot_inventory = HotInventory(_lease_session)
+
+change_events.on_commit(Product.__tablename__, hot_inventory._on_change)
+
+
+@event.listens_for(Session, "after_commit")
+def _settle_taken(session):
+    session.info.pop(_TAKEN_KEY, None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _return_taken(session, transaction):
+    # Runs after after_commit, so only a rollback or close leaves units here.
+    if transaction.parent is None:
+        taken = session.info.pop(_TAKEN_KEY, None)
+        if taken:
+            hot_inventory.give_back(taken)
@@ -0,0 +1,62 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, max-age=60")
+# Marketplace bodies carry live stock, so by default browsers revalidate them
+# (cheaply, through the ETag) on every use instead of reusing a stale copy.
+MARKETPLACE_CACHE_CONTROL = os.getenv("MARKETPLACE_CACHE_CONTROL", "no-cache")
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/"x" matches "x".
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in (value[2:] if value.startswith("W/") else value for value in candidates)
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request,
+    body: bytes,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = CATALOG_CACHE_CONTROL,
+) -> Response:
+    """Return `body` as JSON with validators, or a bodyless 304 if the
+    client's copy is current.
+
+    The ETag is a hash of the body, so it is identical across workers that
+    serve the same data. `last_modified` is naive UTC, like `updated_at`.
+    """
+    headers = {"ETag": make_etag(body), "Cache-Control": cache_control}
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, headers["ETag"])
+    elif last_modified is not None and "if-modified-since" in request.headers:
+        not_modified = _not_modified_since(request.headers["if-modified-since"], last_modified)
+    else:
+        not_modified = False
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,76 @@
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.db import change_events
+from app.models.catalog import Product
+from app.services.hot_inventory import hot_inventory
+
+_products = Product.__table__
+
+# One conditional decrement per line. Run as a single executemany batch, the
+# WHERE clause makes each line succeed only if enough stock is left at the
+# moment its row is locked, so concurrent buyers can never oversell.
+_reserve_stmt = (
+    update(_products)
+    .where(
+        _products.c.id == bindparam("reserve_id"),
+        _products.c.is_active == True,
+        _products.c.stock_quantity >= bindparam("reserve_qty"),
+    )
+    .values(stock_quantity=_products.c.stock_quantity - bindparam("reserve_qty"))
+)
+
+
+def reserve_stock(db: Session, lines: Dict[int, int]) -> Tuple[List[Dict], Set[int]]:
+    """Atomically take `lines` ({product_id: quantity}) out of stock.
+
+    Returns the shortfalls and the ids of the lines served from leased hot
+    stock, whose product rows were not updated. Either every line is
+    reserved and the shortfalls are empty, or the transaction is rolled back
+    and there is one shortfall per short line.
+    Rows are updated in product id order so that concurrent reservations
+    always lock in the same order and can't deadlock each other.
+
+    Hot items are taken from this worker's leased stock (see HotInventory)
+    before any row is locked; they go back to the lease if the rest of the
+    order can't be reserved or the transaction rolls back.
+    """
+    hot_ids = hot_inventory.hot_ids(db) if lines else set()
+    hot_lines = {pid: qty for pid, qty in lines.items() if pid in hot_ids}
+    if hot_lines:
+        shortfalls = hot_inventory.take(db, hot_lines)
+        if shortfalls:
+            return shortfalls, set()
+    params = [{"reserve_id": pid, "reserve_qty": qty} for pid, qty in sorted(lines.items()) if pid not in hot_lines]
+    if not params:
+        return [], set(hot_lines)
+
+    if db.get_bind().dialect.supports_sane_multi_rowcount:
+        reserved = db.execute(_reserve_stmt, params).rowcount
+    else:
+        reserved = sum(db.execute(_reserve_stmt, line).rowcount for line in params)
+
+    if reserved == len(params):
+        change_events.mark_updated(db, Product.__tablename__, [line["reserve_id"] for line in params])
+        return [], set(hot_lines)
+
+    db.rollback()
+    cold_lines = {line["reserve_id"]: line["reserve_qty"] for line in params}
+    available = dict(
+        db.query(Product.id, Product.stock_quantity)
+        .filter(Product.id.in_(cold_lines), Product.is_active == True)
+        .all()
+    )
+    shortfalls = [
+        {"product_id": pid, "requested": qty, "available": available.get(pid)}
+        for pid, qty in sorted(cold_lines.items())
+        if available.get(pid) is None or available[pid] < qty
+    ]
+    # Stock may have been restocked since the failed batch; still report the
+    # failure rather than an empty (successful-looking) result.
+    return shortfalls or [
+        {"product_id": pid, "requested": qty, "available": available.get(pid)}
+        for pid, qty in sorted(cold_lines.items())
+    ], set()
@@ -0,0 +1,115 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+
+class PageParams:
+    """Query parameters shared by every keyset-paginated list endpoint."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.limit}:{self.cursor or ''}"
+
+
+def encode_cursor(values: Dict) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _cursor_int(values: Dict, key: str) -> int:
+    value = values.get(key)
+    if not isinstance(value, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+
+def decode_offset(page: PageParams) -> int:
+    """Offset cursors are used where results are ranked rather than keyed."""
+    if not page.cursor:
+        return 0
+    offset = _cursor_int(decode_cursor(page.cursor), "offset")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+
+def decode_keyset(page: PageParams, *keys: str) -> Optional[Tuple[int, ...]]:
+    """Integer sort key of the last row on the previous page, if any."""
+    if not page.cursor:
+        return None
+    values = decode_cursor(page.cursor)
+    return tuple(_cursor_int(values, key) for key in keys)
+
+
+async def paginate_by_id(db: AsyncSession, stmt, model, page: PageParams) -> Tuple[List, Optional[str]]:
+    """Return one page of `stmt` in ascending id order and the next cursor."""
+    if page.cursor:
+        stmt = stmt.where(model.id > _cursor_int(decode_cursor(page.cursor), "id"))
+    result = await db.execute(stmt.order_by(model.id).limit(page.limit + 1))
+    rows = list(result.scalars().all())
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_cursor = encode_cursor({"id": rows[-1].id})
+    return rows, next_cursor
+
+
+def paginate_newest_first(query, model, page: PageParams) -> Tuple[List, Optional[str]]:
+    """Return one page of `query` ordered by (created_at, id) descending."""
+    if page.cursor:
+        values = decode_cursor(page.cursor)
+        try:
+            created_at = datetime.fromisoformat(values.get("created_at"))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        last_id = _cursor_int(values, "id")
+        query = query.filter(
+            or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < last_id),
+            )
+        )
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(page.limit + 1).all()
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor({"created_at": last.created_at.isoformat(), "id": last.id})
+    return rows, next_cursor
+
+
+def set_next_cursor(response, request, next_cursor: Optional[str]) -> None:
+    """Advertise the next page through `X-Next-Cursor` and a `Link` header."""
+    if not next_cursor:
+        return
+    response.headers["X-Next-Cursor"] = next_cursor
+    next_url = request.url.include_query_params(cursor=next_cursor)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
@@ -0,0 +1,131 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", str(max(1, PASSWORD_HASH_WORKERS) * 8)))
+
+_contexts: Dict[int, "CryptContext"] = {}
+
+
+def _context(rounds: int) -> "CryptContext":
+    # Pinning min/max rounds to the configured cost makes needs_update() flag
+    # every hash made with a different cost, which drives rehash-on-login.
+    if rounds not in _contexts:
+        from passlib.context import CryptContext
+
+        _contexts[rounds] = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+    return _contexts[rounds]
+
+
+def _hash(password: str, rounds: int) -> Tuple[float, str]:
+    started_at = time.time()
+    return started_at, _context(rounds).hash(password)
+
+
+def _verify(password: str, hashed: str, rounds: int) -> Tuple[float, Tuple[bool, Optional[str]]]:
+    started_at = time.time()
+    return started_at, _context(rounds).verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool.
+
+    Hashing never runs on request threads, so it uses every core instead of
+    contending for the GIL with other routes, and callers await the result
+    on the event loop rather than holding a worker thread while they wait.
+    The number of jobs waiting or running is bounded; past that, callers get
+    a 503 instead of queueing.
+    """
+
+    def __init__(self, workers: int, max_queue: int, rounds: int):
+        self.workers = workers
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # Workers start from a fresh interpreter: forking the server,
+                # which already runs many threads, can copy held locks.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication is busy, please try again.",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            submitted_at = time.time()
+            if self.workers > 0:
+                loop = asyncio.get_running_loop()
+                started_at, result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            else:
+                started_at, result = await run_in_threadpool(fn, *args)
+        finally:
+            self._slots.release()
+        wait = max(0.0, started_at - submitted_at)
+        with self._stats_lock:
+            self.completed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Return whether `password` matches and, if the stored hash used a
+        different cost, a replacement hash to store."""
+        return await self._run(_verify, password, hashed, self.rounds)
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "bcrypt_rounds": self.rounds,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_queue_wait_ms": round(self.total_wait / self.completed * 1000, 3) if self.completed else 0.0,
+                "max_queue_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, BCRYPT_ROUNDS)
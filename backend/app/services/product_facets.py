@@ -0,0 +1,198 @@
+import asyncio
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import change_events
+from app.models.catalog import Product
+from app.services.catalog_cache import catalog_cache
+from app.services.pagination import PageParams, decode_keyset, encode_cursor
+
+FACETS = ("category", "tags", "price", "availability")
+
+# (label, lower bound inclusive, upper bound exclusive)
+PRICE_BUCKETS: List[Tuple[str, float, Optional[float]]] = [
+    ("0-25", 0, 25),
+    ("25-50", 25, 50),
+    ("50-100", 50, 100),
+    ("100+", 100, None),
+]
+
+_COLUMNS = (Product.id, Product.category, Product.tags, Product.price, Product.stock_quantity, Product.is_active)
+
+
+def _popcount(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+def price_bucket(price: Optional[float]) -> Optional[str]:
+    if price is None:
+        return None
+    for label, low, high in PRICE_BUCKETS:
+        if price >= low and (high is None or price < high):
+            return label
+    return None
+
+
+def facet_values(row) -> Dict[str, Set[str]]:
+    return {
+        "category": {row.category} if row.category else set(),
+        "tags": {str(tag) for tag in (row.tags or [])},
+        "price": {price_bucket(row.price)} - {None},
+        "availability": {"in_stock" if (row.stock_quantity or 0) > 0 else "out_of_stock"},
+    }
+
+
+class ProductFacetIndex:
+    """Posting-list index over active products for faceted browsing.
+
+    Every product gets a slot, in id order, and every facet value keeps a
+    bitmap (a Python int) of the slots that have it. Filtering is OR within
+    a facet and AND across facets; counts are the popcount of a value's
+    bitmap against the other facets' filters, so choosing one category
+    still shows how many products each other category has.
+
+    Commits mark changed products dirty and only those rows are re-read on
+    the next query; reloads, and products inserted out of id order, cause a
+    full rebuild.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        # Every commit seen bumps the generation. `_stale` holds the
+        # generation of the latest change that needs a full rebuild and
+        # `_dirty` that of the latest change to each product, until a
+        # refresh that started after them has been applied.
+        self._generation = 0
+        self._stale: Optional[int] = 0
+        self._dirty: Dict[int, int] = {}
+        self._ids: List[int] = []
+        self._slots: Dict[int, int] = {}
+        self._values: Dict[int, Dict[str, Set[str]]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {facet: defaultdict(int) for facet in FACETS}
+        self._active = 0
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Apply every commit seen so far. Concurrent callers wait for the
+        refresh in flight instead of reading an index it hasn't updated yet."""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            await self._refresh(db)
+
+    async def _refresh(self, db: AsyncSession) -> None:
+        with self._lock:
+            stale, dirty, generation = self._stale is not None, sorted(self._dirty), self._generation
+        if not stale and not dirty:
+            return
+        # Rows read from a replica that may lag a local commit are indexed,
+        # but re-read on the next query.
+        settled = catalog_cache.settled(db, [Product.__tablename__])
+        if not stale:
+            result = await db.execute(select(*_COLUMNS).where(Product.id.in_(dirty)))
+            rows = {row.id: row for row in result.all()}
+            with self._lock:
+                stale = not all([self._apply(product_id, rows.get(product_id)) for product_id in dirty])
+        if stale:
+            result = await db.execute(select(*_COLUMNS).order_by(Product.id))
+            self._rebuild(result.all())
+        if settled:
+            with self._lock:
+                if self._stale is not None and self._stale <= generation:
+                    self._stale = None
+                self._dirty = {product_id: at for product_id, at in self._dirty.items() if at > generation}
+
+    def _rebuild(self, rows) -> None:
+        with self._lock:
+            self._ids, self._slots, self._values = [], {}, {}
+            self._postings = {facet: defaultdict(int) for facet in FACETS}
+            self._active = 0
+            for row in rows:
+                self._apply(row.id, row)
+
+    def _apply(self, product_id: int, row) -> bool:
+        """Index the current state of one product; False if it needs a rebuild."""
+        slot = self._slots.get(product_id)
+        if slot is None:
+            if row is None:
+                return True
+            if self._ids and product_id < self._ids[-1]:
+                return False
+            slot = len(self._ids)
+            self._ids.append(product_id)
+            self._slots[product_id] = slot
+        bit = 1 << slot
+        for facet, values in self._values.pop(slot, {}).items():
+            for value in values:
+                self._postings[facet][value] &= ~bit
+        self._active &= ~bit
+        if row is not None and row.is_active:
+            self._values[slot] = facet_values(row)
+            for facet, values in self._values[slot].items():
+                for value in values:
+                    self._postings[facet][value] |= bit
+            self._active |= bit
+        return True
+
+    def _filter_bits(self, filters: Dict[str, Iterable[str]], skip: Optional[str] = None) -> int:
+        bits = self._active
+        for facet, selected in filters.items():
+            if facet == skip or not selected:
+                continue
+            postings = self._postings[facet]
+            union = 0
+            for value in selected:
+                union |= postings.get(value, 0)
+            bits &= union
+        return bits
+
+    def browse(
+        self, filters: Dict[str, List[str]], page: PageParams
+    ) -> Tuple[List[int], int, Dict[str, Dict[str, int]], Optional[str]]:
+        """Return the page of matching product ids, the total match count,
+        per-facet value counts and the next cursor."""
+        after = decode_keyset(page, "id")
+        with self._lock:
+            bits = self._filter_bits(filters)
+            total = _popcount(bits)
+            counts = {}
+            for facet in FACETS:
+                base = self._filter_bits(filters, skip=facet) if filters.get(facet) else bits
+                facet_counts = {value: _popcount(base & posting) for value, posting in self._postings[facet].items()}
+                counts[facet] = {value: count for value, count in sorted(facet_counts.items()) if count}
+            if after is not None:
+                start = bisect_right(self._ids, after[0])
+                bits = bits >> start << start
+            ids: List[int] = []
+            while bits and len(ids) <= page.limit:
+                lowest = bits & -bits
+                ids.append(self._ids[lowest.bit_length() - 1])
+                bits ^= lowest
+        next_cursor = None
+        if len(ids) > page.limit:
+            ids = ids[: page.limit]
+            next_cursor = encode_cursor({"id": ids[-1]})
+        return ids, total, counts, next_cursor
+
+    def categories(self) -> List[str]:
+        with self._lock:
+            return sorted(value for value, bits in self._postings["category"].items() if bits & self._active)
+
+    def _on_change(self, changes) -> None:
+        with self._lock:
+            self._generation += 1
+            for action, _, row in changes:
+                if action == "reload" or "id" not in row:
+                    self._stale = self._generation
+                else:
+                    self._dirty[row["id"]] = self._generation
+
+
+product_facets = ProductFacetIndex()
+
+change_events.on_commit(Product.__tablename__, product_facets._on_change)
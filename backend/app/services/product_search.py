@@ -0,0 +1,152 @@
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import String, cast, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.catalog import Product
+from app.services.pagination import PageParams, decode_offset, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Weighted document used by the Postgres GIN index; queries must repeat the
+# exact expression for the planner to use the index.
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(tags::text, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+SQLITE_STATEMENTS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, tags)
+        VALUES (new.id, new.name, new.description, new.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, tags)
+        VALUES ('delete', old.id, old.name, old.description, old.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, tags ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, tags)
+        VALUES ('delete', old.id, old.name, old.description, old.tags);
+        INSERT INTO products_fts(rowid, name, description, tags)
+        VALUES (new.id, new.name, new.description, new.tags);
+    END
+    """,
+]
+
+# Which full-text backend install_product_search() managed to set up:
+# "postgresql", "sqlite" or None for the substring fallback.
+_backend: Optional[str] = None
+
+
+def install_product_search(engine: Engine) -> Optional[str]:
+    """Create the full-text index for products and keep it in sync.
+
+    Postgres gets a GIN expression index, which the database maintains on
+    every write. SQLite gets an external-content FTS5 table kept in sync by
+    triggers, so any writer (ORM, bulk loaders, ad-hoc SQL) updates it.
+    """
+    global _backend
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "postgresql":
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN (({PG_DOCUMENT}))"))
+            elif dialect == "sqlite":
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+                ).first()
+                conn.execute(text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+                    "name, description, tags, content='products', content_rowid='id', "
+                    "tokenize='porter unicode61')"
+                ))
+                for statement in SQLITE_STATEMENTS:
+                    conn.execute(text(statement))
+                if not exists:
+                    conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+            else:
+                dialect = None
+    except OperationalError as exc:
+        logger.warning("Full-text product search unavailable, using substring search: %s", exc)
+        dialect = None
+    _backend = dialect
+    return _backend
+
+
+def use_backend(backend: Optional[str]) -> None:
+    """Use a full-text backend installed by an earlier process."""
+    global _backend
+    _backend = backend
+
+
+def _terms(search: str) -> List[str]:
+    return re.findall(r"\w+", search.lower())
+
+
+async def _ranked_ids(db: AsyncSession, search: str, category: Optional[str], limit: int, offset: int) -> List[int]:
+    params = {"limit": limit, "offset": offset, "category": category}
+    category_clause = ""
+    if _backend == "postgresql":
+        if category:
+            category_clause = "AND p.category ILIKE :category"
+        params["q"] = " ".join(_terms(search))
+        sql = f"""
+            SELECT p.id FROM products p, plainto_tsquery('english', :q) AS q
+            WHERE p.is_active AND ({PG_DOCUMENT}) @@ q {category_clause}
+            ORDER BY ts_rank(({PG_DOCUMENT}), q) DESC, p.id
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        if category:
+            category_clause = "AND p.category LIKE :category"
+        terms = _terms(search)
+        # Quote every term so user input can't inject FTS5 syntax; the last
+        # term is a prefix match so results show up while the user types.
+        params["q"] = " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+        sql = f"""
+            SELECT p.id FROM products_fts JOIN products p ON p.id = products_fts.rowid
+            WHERE products_fts MATCH :q AND p.is_active = 1 {category_clause}
+            ORDER BY bm25(products_fts, 10.0, 1.0, 5.0), p.id
+            LIMIT :limit OFFSET :offset
+        """
+    result = await db.execute(text(sql), params)
+    return [row[0] for row in result]
+
+
+async def search_products(
+    db: AsyncSession, search: str, category: Optional[str], page: PageParams
+) -> Tuple[List[Product], Optional[str]]:
+    """Return one relevance-ranked page of active products matching `search`."""
+    offset = decode_offset(page)
+    if _backend is None:
+        term = f"%{search.lower()}%"
+        stmt = select(Product).where(
+            Product.is_active == True,
+            Product.name.ilike(term) | Product.description.ilike(term) | cast(Product.tags, String).ilike(term),
+        )
+        if category:
+            stmt = stmt.where(Product.category.ilike(category))
+        result = await db.execute(stmt.order_by(Product.id).offset(offset).limit(page.limit + 1))
+        rows = list(result.scalars().all())
+    elif not _terms(search):
+        rows = []
+    else:
+        ids = await _ranked_ids(db, search, category, page.limit + 1, offset)
+        result = await db.execute(select(Product).where(Product.id.in_(ids)))
+        by_id = {p.id: p for p in result.scalars().all()}
+        rows = [by_id[i] for i in ids if i in by_id]
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_cursor = encode_cursor({"offset": offset + page.limit})
+    return rows, next_cursor
@@ -0,0 +1,114 @@
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# Buckets that would have refilled completely are dropped from memory once
+# the table grows past this size; a missing bucket is the same as a full one.
+MEMORY_PURGE_THRESHOLD = 100000
+
+
+class MemoryRateLimitBackend:
+    """Token buckets for a single worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, List[float]] = {}
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        """Spend one token and return the tokens left, or a negative number
+        of tokens still missing if the bucket is empty."""
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                self._buckets[key] = [tokens, now]
+                if len(self._buckets) > MEMORY_PURGE_THRESHOLD:
+                    self._purge(now, capacity, rate)
+                return tokens
+            self._buckets[key] = [tokens, now]
+            return tokens - 1
+
+    def _purge(self, now: float, capacity: float, rate: float) -> None:
+        full_after = capacity / rate if rate > 0 else math.inf
+        stale = [k for k, (_, updated_at) in self._buckets.items() if now - updated_at >= full_after]
+        for key in stale:
+            del self._buckets[key]
+
+
+class DatabaseRateLimitBackend:
+    """Token buckets in the `rate_limit_buckets` table, shared by every worker.
+
+    Refill and spend happen in one conditional upsert, so concurrent workers
+    never double-spend a token.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        least = "LEAST" if engine.dialect.name == "postgresql" else "MIN"
+        refilled = f"{least}(:capacity, rate_limit_buckets.tokens + (:now - rate_limit_buckets.updated_at) * :rate)"
+        self._take_sql = text(
+            "INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (:key, :capacity - 1, :now) "
+            f"ON CONFLICT (key) DO UPDATE SET tokens = {refilled} - 1, updated_at = :now "
+            f"WHERE {refilled} >= 1 "
+            "RETURNING tokens"
+        )
+        self._peek_sql = text(f"SELECT {refilled} FROM rate_limit_buckets WHERE key = :key")
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        params = {"key": key, "capacity": capacity, "rate": rate, "now": now}
+        with self.engine.begin() as conn:
+            row = conn.execute(self._take_sql, params).first()
+            if row is not None:
+                return row[0]
+            tokens = conn.execute(self._peek_sql, params).scalar() or 0.0
+        return tokens - 1
+
+
+class RateLimiter:
+    """Per-user token buckets with limits taken from the subscription plans.
+
+    `limits` maps a tier name to {scope: {"burst": n, "per_minute": m}}.
+    """
+
+    def __init__(self, backend, limits: Dict[str, Dict[str, Dict[str, float]]], default_tier: str = "free"):
+        self.backend = backend
+        self.limits = limits
+        self.default_tier = default_tier
+
+    def _limit(self, tier: Optional[str], scope: str) -> Optional[Tuple[float, float]]:
+        plan = self.limits.get((tier or "").lower()) or self.limits[self.default_tier]
+        limit = plan.get(scope)
+        if not limit:
+            return None
+        return float(limit["burst"]), limit["per_minute"] / 60.0
+
+    def check(self, scope: str, key: str, tier: Optional[str]) -> None:
+        """Spend one request from `key`'s bucket or raise a 429."""
+        limit = self._limit(tier, scope)
+        if limit is None:
+            return
+        capacity, rate = limit
+        remaining = self.backend.take(f"{scope}:{key}", capacity, rate, time.time())
+        if remaining < 0:
+            retry_after = max(1, math.ceil(-remaining / rate)) if rate > 0 else 3600
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded, please slow down.",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+
+def build_rate_limit_backend(engine: Engine):
+    backend_name = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if backend_name == "database":
+        return DatabaseRateLimitBackend(engine)
+    if backend_name == "memory":
+        return MemoryRateLimitBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend_name}")
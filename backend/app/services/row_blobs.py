@@ -0,0 +1,78 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import orjson
+
+from app.db import change_events
+
+
+class RowBlobCache:
+    """JSON-encoded response objects for individual catalog rows.
+
+    Each row is validated against its response schema and encoded with
+    orjson once, then reused by every list page and detail response that
+    includes it until a commit touches the row. List bodies are built by
+    joining the cached blobs.
+    """
+
+    def __init__(self, max_rows: int = 100000):
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._serializers: Dict[str, Callable[[Any], Dict]] = {}
+        self._blobs: Dict[str, "OrderedDict[int, bytes]"] = {}
+        self._generations: Dict[str, int] = {}
+
+    def register(self, model, serialize: Callable[[Any], Dict]) -> None:
+        """Cache rows of `model`; `serialize` turns a row into JSON-ready data."""
+        tablename = model.__tablename__
+        self._serializers[tablename] = serialize
+        self._blobs[tablename] = OrderedDict()
+        self._generations[tablename] = 0
+        change_events.on_commit(tablename, self._on_change)
+
+    def generation(self, tablename: str) -> int:
+        """Take before loading rows, and pass to blob()/join() afterwards, so
+        rows read before an invalidation are never cached."""
+        return self._generations[tablename]
+
+    def get(self, tablename: str, row_id: int) -> Optional[bytes]:
+        with self._lock:
+            blobs = self._blobs[tablename]
+            blob = blobs.get(row_id)
+            if blob is not None:
+                blobs.move_to_end(row_id)
+            return blob
+
+    def blob(self, row, generation: Optional[int]) -> bytes:
+        """The row's blob, cached unless `generation` is stale or None."""
+        tablename = row.__tablename__
+        blob = self.get(tablename, row.id)
+        if blob is None:
+            blob = orjson.dumps(self._serializers[tablename](row))
+            with self._lock:
+                if generation is not None and self._generations[tablename] == generation:
+                    blobs = self._blobs[tablename]
+                    blobs[row.id] = blob
+                    while len(blobs) > self.max_rows:
+                        blobs.popitem(last=False)
+        return blob
+
+    def join(self, rows: Iterable, generation: Optional[int]) -> bytes:
+        return b"[" + b",".join(self.blob(row, generation) for row in rows) + b"]"
+
+    def invalidate(self, tablename: str, row_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._generations[tablename] += 1
+            if row_id is None:
+                self._blobs[tablename].clear()
+            else:
+                self._blobs[tablename].pop(row_id, None)
+
+    def _on_change(self, changes) -> None:
+        for action, tablename, row in changes:
+            self.invalidate(tablename, None if action == "reload" else row.get("id"))
+
+
+row_blobs = RowBlobCache(max_rows=int(os.getenv("ROW_BLOB_CACHE_MAX_ROWS", "100000")))
@@ -0,0 +1,162 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.db import change_events
+from app.models.catalog import HistoricalEvent, HistoricalFigure
+from app.services.catalog_cache import catalog_cache
+
+DocKey = Tuple[str, int]
+
+# Searchable fields per document kind with their BM25 term-frequency weight.
+FIELD_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "figure": {"name": 5.0, "profession": 3.0, "achievements": 2.0, "biography": 1.0},
+    "event": {"title": 5.0, "key_figures": 3.0, "location": 2.0, "significance": 1.0, "description": 1.0},
+}
+MODELS = {"figure": HistoricalFigure, "event": HistoricalEvent}
+STOPWORDS = {"a", "an", "and", "at", "by", "for", "from", "in", "is", "of", "on", "or", "the", "to", "was", "with"}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [token for item in value for token in tokenize(item)]
+    return [t for t in re.findall(r"\w+", str(value).lower()) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """In-memory inverted index over historical figures and events.
+
+    Built once from the database and then kept current from ORM commit
+    events; kinds changed outside the ORM are flagged stale and reloaded on
+    the next search.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[DocKey, float]] = defaultdict(dict)
+        self._doc_terms: Dict[DocKey, Set[str]] = {}
+        self._doc_lengths: Dict[DocKey, float] = {}
+        self._fields: Dict[DocKey, Dict] = {}
+        self._stale: Set[str] = set(MODELS)
+        self._generations: Dict[str, int] = defaultdict(int)  # commits applied per kind
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def _remove(self, key: DocKey) -> None:
+        for term in self._doc_terms.pop(key, ()):
+            postings = self._postings[term]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+        self._doc_lengths.pop(key, None)
+
+    def _add(self, key: DocKey, fields: Dict) -> None:
+        self._remove(key)
+        weights: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS[key[0]].items():
+            for token in tokenize(fields.get(field)):
+                weights[token] += weight
+        for term, weight in weights.items():
+            self._postings[term][key] = weight
+        self._doc_terms[key] = set(weights)
+        self._doc_lengths[key] = sum(weights.values())
+        self._fields[key] = fields
+
+    def upsert(self, kind: str, row: Dict) -> None:
+        key = (kind, row["id"])
+        with self._lock:
+            fields = dict(self._fields.get(key, {}))
+            fields.update(row)
+            self._add(key, fields)
+
+    def delete(self, kind: str, doc_id: int) -> None:
+        with self._lock:
+            self._remove((kind, doc_id))
+            self._fields.pop((kind, doc_id), None)
+
+    def load(self, db: Session, kinds: Optional[Iterable[str]] = None) -> None:
+        """(Re)build the postings for `kinds` from the database."""
+        for kind in list(kinds or MODELS):
+            model = MODELS[kind]
+            columns = ["id"] + list(FIELD_WEIGHTS[kind]) + (["name"] if kind == "figure" else ["title", "year"])
+            with self._lock:
+                generation = self._generations[kind]
+            rows = db.query(*[getattr(model, c) for c in dict.fromkeys(columns)]).all()
+            with self._lock:
+                for key in [k for k in self._fields if k[0] == kind]:
+                    self._remove(key)
+                    del self._fields[key]
+                for row in rows:
+                    self._add((kind, row.id), dict(row._mapping))
+                # Rows that may miss a commit applied while the query ran, or
+                # read from a replica that may lag a local commit, are used
+                # for now and read again next time.
+                if self._generations[kind] == generation and catalog_cache.settled(db, [model.__tablename__]):
+                    self._stale.discard(kind)
+
+    def mark_stale(self, kind: str) -> None:
+        with self._lock:
+            self._stale.add(kind)
+
+    def search(
+        self, db: Session, query: str, kinds: Sequence[str], limit: int, offset: int = 0
+    ) -> Tuple[int, List[Dict]]:
+        """Return the total hit count and one ranked page of results."""
+        stale = [kind for kind in kinds if kind in self._stale]
+        if stale:
+            self.load(db, stale)
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            total_docs = len(self._doc_lengths) or 1
+            avg_length = (sum(self._doc_lengths.values()) / total_docs) or 1.0
+            scores: Dict[DocKey, float] = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    if key[0] not in kinds:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[key] / avg_length)
+                    scores[key] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            page = [self._result(key, score) for key, score in ranked[offset:offset + limit]]
+        return len(ranked), page
+
+    def _result(self, key: DocKey, score: float) -> Dict:
+        fields = self._fields[key]
+        if key[0] == "figure":
+            return {"type": "figure", "id": key[1], "title": fields.get("name"),
+                    "subtitle": fields.get("profession"), "score": round(score, 4)}
+        return {"type": "event", "id": key[1], "title": fields.get("title"),
+                "subtitle": fields.get("location"), "year": fields.get("year"), "score": round(score, 4)}
+
+    def _on_change(self, changes) -> None:
+        kinds = {model.__tablename__: kind for kind, model in MODELS.items()}
+        for action, tablename, row in changes:
+            kind = kinds[tablename]
+            with self._lock:
+                self._generations[kind] += 1
+            if action == "reload":
+                self.mark_stale(kind)
+            elif action == "delete":
+                self.delete(kind, row["id"])
+            elif "id" in row:
+                self.upsert(kind, row)
+
+
+search_index = SearchIndex()
+
+for _model in MODELS.values():
+    change_events.on_commit(_model.__tablename__, search_index._on_change)
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import bindparam, case, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.db import change_events
+from app.models.catalog import Product
+from app.models.commerce import CartItem, Order, OrderItem, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_BATCH_SIZE = int(os.getenv("STRIPE_WEBHOOK_BATCH_SIZE", "100"))
+WEBHOOK_POLL_SECONDS = float(os.getenv("STRIPE_WEBHOOK_POLL_SECONDS", "5"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("STRIPE_WEBHOOK_MAX_ATTEMPTS", "5"))
+
+_orders = Order.__table__
+_products = Product.__table__
+
+_complete_order_stmt = (
+    update(_orders)
+    .where(_orders.c.id == bindparam("order_id"), _orders.c.status != "completed")
+    .values(status="completed", stripe_payment_intent_id=bindparam("payment_intent"))
+)
+
+_decrement_stock_stmt = (
+    update(_products)
+    .where(_products.c.id == bindparam("product_id"))
+    .values(
+        stock_quantity=case(
+            (_products.c.stock_quantity > bindparam("quantity"), _products.c.stock_quantity - bindparam("quantity")),
+            else_=0,
+        )
+    )
+)
+
+
+def store_event(db: Session, event: Dict, payload: bytes) -> None:
+    """Insert a verified event into the inbox; redeliveries are ignored."""
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    db.execute(
+        insert(StripeEvent.__table__)
+        .values(
+            id=event["id"],
+            type=event["type"],
+            payload=payload.decode(),
+            status="pending",
+            attempts=0,
+            received_at=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["id"])
+    )
+    db.commit()
+
+
+def complete_checkout_sessions(db: Session, payment_intents: Dict[str, Optional[str]]) -> int:
+    """Mark the orders for `payment_intents` ({session_id: payment_intent})
+    completed, take their items out of stock and clear the buyers' carts,
+    with a fixed number of set-based statements."""
+    orders = db.execute(
+        select(_orders.c.id, _orders.c.user_id, _orders.c.stripe_checkout_session_id).where(
+            _orders.c.stripe_checkout_session_id.in_(payment_intents),
+            _orders.c.status != "completed",
+        )
+    ).all()
+    if not orders:
+        return 0
+
+    order_ids = [order.id for order in orders]
+    db.execute(
+        _complete_order_stmt,
+        [
+            {"order_id": order.id, "payment_intent": payment_intents[order.stripe_checkout_session_id]}
+            for order in orders
+        ],
+    )
+
+    quantities = db.execute(
+        select(OrderItem.product_id, func.sum(OrderItem.quantity))
+        .where(OrderItem.order_id.in_(order_ids))
+        .group_by(OrderItem.product_id)
+        .order_by(OrderItem.product_id)
+    ).all()
+    if quantities:
+        db.execute(
+            _decrement_stock_stmt,
+            [{"product_id": product_id, "quantity": quantity} for product_id, quantity in quantities],
+        )
+        change_events.mark_updated(db, Product.__tablename__, [product_id for product_id, _ in quantities])
+
+    db.execute(delete(CartItem).where(CartItem.user_id.in_({order.user_id for order in orders})))
+    return len(orders)
+
+
+def _payment_intents(events) -> Dict[str, Optional[str]]:
+    """{checkout session id: payment intent} for the completed-checkout events."""
+    payment_intents: Dict[str, Optional[str]] = {}
+    for event in events:
+        if event.type == "checkout.session.completed":
+            session_obj = json.loads(event.payload)["data"]["object"]
+            payment_intents[session_obj.get("id")] = session_obj.get("payment_intent")
+    return payment_intents
+
+
+def _record_attempt(event: StripeEvent, error: Optional[str], now: datetime) -> None:
+    event.attempts = (event.attempts or 0) + 1
+    if error is None:
+        event.status = "processed"
+        event.processed_at = now
+    else:
+        event.last_error = error
+        if event.attempts >= WEBHOOK_MAX_ATTEMPTS:
+            event.status = "failed"
+
+
+def _process_one(db: Session, event_id: str) -> None:
+    """Process a single event in its own transaction, so a failure only
+    counts against that event's attempts."""
+    event = (
+        db.query(StripeEvent)
+        .filter(StripeEvent.id == event_id, StripeEvent.status == "pending")
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if event is None:
+        db.rollback()
+        return
+    try:
+        complete_checkout_sessions(db, _payment_intents([event]))
+        error = None
+    except Exception as exc:
+        logger.exception("Failed to process Stripe webhook %s", event_id)
+        db.rollback()
+        event = db.query(StripeEvent).filter(StripeEvent.id == event_id).with_for_update().one()
+        error = str(exc)
+    _record_attempt(event, error, datetime.utcnow())
+    db.commit()
+
+
+def process_pending_events(db: Session, batch_size: int = WEBHOOK_BATCH_SIZE) -> int:
+    """Process one batch of inbox events and return how many were claimed.
+
+    The batch is applied with a fixed number of statements. If that fails,
+    for a malformed payload or a bad order, it is rolled back and its events
+    are retried one at a time, so the valid ones still go through and only
+    the failing event uses up an attempt.
+    """
+    events = (
+        db.query(StripeEvent)
+        .filter(StripeEvent.status == "pending")
+        .order_by(StripeEvent.received_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not events:
+        db.rollback()
+        return 0
+
+    event_ids = [event.id for event in events]
+    try:
+        complete_checkout_sessions(db, _payment_intents(events))
+    except Exception:
+        logger.exception("Failed to process Stripe webhook batch; retrying its events one at a time")
+        db.rollback()
+        for event_id in event_ids:
+            _process_one(db, event_id)
+        return len(event_ids)
+
+    now = datetime.utcnow()
+    for event in events:
+        _record_attempt(event, None, now)
+    db.commit()
+    return len(events)
+
+
+class StripeWebhookWorker:
+    """Background task that drains the webhook inbox in batches.
+
+    The webhook endpoint wakes it after storing an event; it also polls so
+    events left behind by a crashed or restarted worker are picked up.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _drain(self) -> None:
+        db = self.session_factory()
+        try:
+            while process_pending_events(db) == WEBHOOK_BATCH_SIZE:
+                pass
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), WEBHOOK_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await run_in_threadpool(self._drain)
+            except Exception:
+                logger.exception("Stripe webhook worker iteration failed")
@@ -0,0 +1,123 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import change_events
+from app.models.catalog import HistoricalEvent
+from app.services.catalog_cache import catalog_cache
+from app.services.pagination import PageParams, decode_keyset, encode_cursor
+
+BUCKET_SIZES = {"decade": 10, "century": 100}
+
+Entry = Tuple[int, int]  # (year, event id)
+
+
+class YearIndex:
+    """Events sorted by (year, id) for range lookups by binary search.
+
+    A year range costs O(log n) to locate plus O(k) to read its k events.
+    Commits keep it current row by row; changes made outside the ORM mark
+    it stale and it is reloaded, via the `year` index, on the next lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: List[Entry] = []
+        self._years: Dict[int, int] = {}
+        self._titles: Dict[int, str] = {}
+        self._stale = True
+        self._generation = 0  # bumped by every commit applied
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self._stale:
+            return
+        with self._lock:
+            generation = self._generation
+        result = await db.execute(
+            select(HistoricalEvent.id, HistoricalEvent.year, HistoricalEvent.title)
+            .where(HistoricalEvent.year.isnot(None))
+            .order_by(HistoricalEvent.year, HistoricalEvent.id)
+        )
+        rows = result.all()
+        settled = catalog_cache.settled(db, [HistoricalEvent.__tablename__])
+        with self._lock:
+            self._entries = [(row.year, row.id) for row in rows]
+            self._years = {row.id: row.year for row in rows}
+            self._titles = {row.id: row.title for row in rows}
+            # Rows that may miss a commit applied while the query ran, or
+            # read from a replica that may lag a local commit, are used for
+            # now and read again next time.
+            self._stale = self._generation != generation or not settled
+
+    def _bounds(self, from_year: Optional[int], to_year: Optional[int]) -> Tuple[int, int]:
+        lo = 0 if from_year is None else bisect_left(self._entries, (from_year,))
+        hi = len(self._entries) if to_year is None else bisect_right(self._entries, (to_year, float("inf")))
+        return lo, hi
+
+    def page(
+        self, from_year: Optional[int], to_year: Optional[int], page: PageParams
+    ) -> Tuple[List[int], Optional[str]]:
+        """Event ids in the year range, in (year, id) order, one page at a time."""
+        after = decode_keyset(page, "year", "id")
+        with self._lock:
+            lo, hi = self._bounds(from_year, to_year)
+            if after is not None:
+                lo = max(lo, bisect_right(self._entries, after))
+            entries = self._entries[lo : min(hi, lo + page.limit + 1)]
+        next_cursor = None
+        if len(entries) > page.limit:
+            entries = entries[: page.limit]
+            next_cursor = encode_cursor({"year": entries[-1][0], "id": entries[-1][1]})
+        return [event_id for _, event_id in entries], next_cursor
+
+    def timeline(self, from_year: Optional[int], to_year: Optional[int], group: str) -> List[Dict]:
+        """Events in the year range grouped into decade or century buckets."""
+        size = BUCKET_SIZES[group]
+        buckets: List[Dict] = []
+        with self._lock:
+            lo, hi = self._bounds(from_year, to_year)
+            for year, event_id in self._entries[lo:hi]:
+                start = year // size * size
+                if not buckets or buckets[-1]["start"] != start:
+                    buckets.append({"start": start, "end": start + size - 1, "count": 0, "events": []})
+                bucket = buckets[-1]
+                bucket["count"] += 1
+                bucket["events"].append({"id": event_id, "title": self._titles.get(event_id), "year": year})
+        return buckets
+
+    def _remove(self, event_id: int) -> None:
+        year = self._years.pop(event_id, None)
+        self._titles.pop(event_id, None)
+        if year is not None:
+            index = bisect_left(self._entries, (year, event_id))
+            if index < len(self._entries) and self._entries[index] == (year, event_id):
+                del self._entries[index]
+
+    def _on_change(self, changes) -> None:
+        with self._lock:
+            self._generation += 1
+            for action, _, row in changes:
+                if action == "reload" or "id" not in row:
+                    self._stale = True
+                elif action == "delete":
+                    self._remove(row["id"])
+                elif "year" in row:
+                    title = row.get("title", self._titles.get(row["id"]))
+                    self._remove(row["id"])
+                    if row["year"] is not None:
+                        insort(self._entries, (row["year"], row["id"]))
+                        self._years[row["id"]] = row["year"]
+                        self._titles[row["id"]] = title
+                elif "title" in row and row["id"] in self._titles:
+                    self._titles[row["id"]] = row["title"]
+
+
+year_index = YearIndex()
+
+change_events.on_commit(HistoricalEvent.__tablename__, year_index._on_change)
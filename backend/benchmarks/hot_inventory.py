@@ -0,0 +1,80 @@
+"""Flash-sale purchases per second, row-locking path vs hot-item leases.
+
+    cd backend && DATABASE_URL=postgresql://... python -m benchmarks.hot_inventory --buyers 32
+
+Each buyer thread repeatedly reserves one unit of the same product in its own
+session, holds the transaction open for --work-ms (standing in for writing
+the order rows) and commits, until the stock runs out. "locking" is an
+ordinary product, whose row stays locked for the whole transaction; "hot"
+is the same product flagged is_hot_item. Both runs check that exactly
+--stock units were sold. Use Postgres: SQLite takes a database-wide write
+lock, which hides the row lock being measured.
+"""
+import argparse
+import threading
+import time
+
+from sqlalchemy import delete
+
+from app.db.bootstrap import bootstrap_database
+from app.db.database import SessionLocal, engine
+from app.models.catalog import Product
+from app.services.hot_inventory import hot_inventory
+from app.services.inventory import reserve_stock
+
+
+def run(hot: bool, buyers: int, stock: int, work_ms: float):
+    with SessionLocal() as db:
+        product = Product(
+            name="Benchmark flash sale item", price=1.0, category="Benchmark",
+            stock_quantity=stock, is_active=True, is_hot_item=hot,
+        )
+        db.add(product)
+        db.commit()
+        product_id = product.id
+
+    sold = []
+
+    def buyer() -> None:
+        count = 0
+        while True:
+            with SessionLocal() as db:
+                if reserve_stock(db, {product_id: 1})[0]:
+                    break
+                time.sleep(work_ms / 1000)
+                db.commit()
+                count += 1
+        sold.append(count)
+
+    threads = [threading.Thread(target=buyer) for _ in range(buyers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    hot_inventory.flush()
+    with SessionLocal() as db:
+        left = db.get(Product, product_id).stock_quantity
+        db.execute(delete(Product).where(Product.id == product_id))
+        db.commit()
+    assert sum(sold) + left == stock and left == 0, (sum(sold), left, stock)
+    return sum(sold) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buyers", type=int, default=32)
+    parser.add_argument("--stock", type=int, default=2000)
+    parser.add_argument("--work-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    bootstrap_database(engine)
+    print(f"{args.buyers} buyers, {args.stock} units, {args.work_ms} ms per order, purchases/sec:")
+    for name, hot in (("locking", False), ("hot", True)):
+        print(f"  {name:<8} {run(hot, args.buyers, args.stock, args.work_ms):10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""CPU spent serializing a catalog list response, before and after row blobs.
+
+    cd backend && python -m benchmarks.serialization --rows 500
+
+"before" is the response_model path: validate the ORM rows, run
+jsonable_encoder and the stdlib JSON encoder. "cold" builds the body from
+orjson row blobs with an empty cache (the first request after a change);
+"warm" joins blobs that are already cached.
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.main import HistoricalFigure
+from app.models.catalog import HistoricalFigure as HistoricalFigureDB
+from app.services.row_blobs import row_blobs
+
+
+def make_rows(count: int) -> List[HistoricalFigureDB]:
+    return [
+        HistoricalFigureDB(
+            id=i,
+            name=f"Figure {i}",
+            birth_year=1900 + i % 100,
+            death_year=None,
+            profession="Writer, Activist and Educator",
+            achievements=[f"Achievement {n} of figure {i}" for n in range(5)],
+            biography="A long biography paragraph with plenty of detail. " * 20,
+            image_url=f"https://example.org/images/{i}.jpg",
+            category="Arts & Literature",
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def cpu_ms(fn, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    adapter = TypeAdapter(List[HistoricalFigure])
+    tablename = HistoricalFigureDB.__tablename__
+
+    def before() -> bytes:
+        content = jsonable_encoder(adapter.validate_python(rows, from_attributes=True))
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def cold() -> bytes:
+        row_blobs.invalidate(tablename)
+        return row_blobs.join(rows, row_blobs.generation(tablename))
+
+    def warm() -> bytes:
+        return row_blobs.join(rows, row_blobs.generation(tablename))
+
+    assert json.loads(before()) == json.loads(cold()) == json.loads(warm())
+    print(f"{args.rows} figures per response, CPU ms per request:")
+    for name, fn in (("before", before), ("cold", cold), ("warm", warm)):
+        print(f"  {name:<6} {cpu_ms(fn, args.repeat):8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# The engines are created when app.db.database is imported, so the test
+# database has to be configured before any test module imports the app.
+_db_dir = tempfile.mkdtemp(prefix="black-excellence-tests-")
+_db_path = os.path.join(_db_dir, "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_path}"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["ASYNC_DATABASE_READ_URL"] = ""
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+os.environ["AI_CACHE_BACKEND"] = "memory"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Create the schema and seed data, for tests that don't start the app."""
+    from app.db.bootstrap import bootstrap_database
+    from app.db.database import engine
+
+    bootstrap_database(engine)
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    from fastapi.testclient import TestClient
+
+    from app.main import app, checkout_rate_limit
+
+    app.dependency_overrides[checkout_rate_limit] = lambda: None
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def make_product(database):
+    """Return a function that commits a new product and returns its id;
+    keyword arguments override the column defaults."""
+    from app.db.database import SessionLocal
+    from app.models.catalog import Product
+
+    def create(**values):
+        columns = dict(
+            name=f"Test item {uuid.uuid4().hex[:8]}", description="", price=1.0,
+            category="Test", image_urls=[], tags=[], stock_quantity=1,
+        )
+        columns.update(values)
+        with SessionLocal() as db:
+            product = Product(**columns)
+            db.add(product)
+            db.commit()
+            return product.id
+
+    return create
+
+
+@pytest.fixture
+def make_auth_headers(client):
+    """Return a function that registers a new user and returns its Authorization header."""
+
+    def register():
+        name = f"user-{uuid.uuid4().hex[:12]}"
+        response = client.post(
+            "/api/auth/register", json={"email": f"{name}@example.com", "username": name, "password": "secret"}
+        )
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return register
+
+
+@pytest.fixture
+def auth_headers(make_auth_headers):
+    return make_auth_headers()
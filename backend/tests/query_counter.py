@@ -0,0 +1,35 @@
+"""Test helper: count the SQL statements an endpoint runs."""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_statements: ContextVar[Optional[List[str]]] = ContextVar("query_counter_statements", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    statements = _statements.get()
+    if statements is not None:
+        statements.append(statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """Collect the SQL statements executed inside the block, on any engine.
+
+    The list is shared with threads started from this context, so it also
+    sees queries run by sync endpoints in the threadpool:
+
+        with count_queries() as statements:
+            client.get("/api/orders", headers=auth)
+        assert len(statements) <= 3
+    """
+    statements: List[str] = []
+    token = _statements.set(statements)
+    try:
+        yield statements
+    finally:
+        _statements.reset(token)
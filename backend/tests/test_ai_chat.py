@@ -0,0 +1,178 @@
+"""Ask the Historian against a local fake of the OpenAI-compatible upstream."""
+import asyncio
+import json
+import socket
+import threading
+import time
+import uuid
+
+import pytest
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.services import ai_chat
+
+WORDS = ["Hello", " from", " the", " fake", " historian."]
+
+upstream = FastAPI()
+upstream_state = {"calls": 0, "active": 0, "max_active": 0, "closed": 0}
+
+
+def _delay(body) -> float:
+    content = body["messages"][0]["content"]
+    return float(content.split("delay=")[1].split()[0]) if "delay=" in content else 0.0
+
+
+@upstream.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    upstream_state["calls"] += 1
+    delay = _delay(body)
+
+    if body.get("stream"):
+        async def chunks():
+            try:
+                for word in WORDS:
+                    await asyncio.sleep(delay or 0.05)
+                    chunk = {
+                        "id": "chunk", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                        "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+            except asyncio.CancelledError:
+                upstream_state["closed"] += 1
+                raise
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    upstream_state["active"] += 1
+    upstream_state["max_active"] = max(upstream_state["max_active"], upstream_state["active"])
+    try:
+        await asyncio.sleep(delay)
+    finally:
+        upstream_state["active"] -= 1
+    return {
+        "id": "completion", "object": "chat.completion", "created": 0, "model": body["model"],
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(WORDS)}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 5, "total_tokens": 6},
+    }
+
+
+@pytest.fixture(scope="module")
+def upstream_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(upstream, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "fake upstream did not start"
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture(autouse=True)
+def fake_upstream(upstream_url, monkeypatch):
+    monkeypatch.setenv("NVIDIA_API_KEY", "test-key")
+    monkeypatch.setattr(ai_chat, "AI_BASE_URL", upstream_url)
+    monkeypatch.setattr(ai_chat, "_state", None)
+    upstream_state.update(calls=0, active=0, max_active=0, closed=0)
+
+
+def _params(prompt: str):
+    # A fresh prompt per call keeps the completion cache out of the way.
+    message = f"{prompt} {uuid.uuid4().hex}"
+    return ai_chat.completion_params(message, 0.2, 0.7, 64, False), message
+
+
+async def _run(coro):
+    try:
+        return await coro
+    finally:
+        await ai_chat.close_client()
+
+
+def test_identical_concurrent_prompts_share_one_upstream_call():
+    params, key = _params("delay=0.2")
+
+    async def scenario():
+        return await asyncio.gather(*(ai_chat.complete(params, key) for _ in range(5)))
+
+    results = asyncio.run(_run(scenario()))
+    assert results == ["".join(WORDS)] * 5
+    assert upstream_state["calls"] == 1
+
+
+def test_upstream_calls_are_capped_by_the_semaphore(monkeypatch):
+    monkeypatch.setattr(ai_chat, "AI_MAX_CONCURRENCY", 2)
+
+    async def scenario():
+        prompts = [_params("delay=0.2") for _ in range(5)]
+        return await asyncio.gather(*(ai_chat.complete(params, key) for params, key in prompts))
+
+    assert len(asyncio.run(_run(scenario()))) == 5
+    assert upstream_state["calls"] == 5
+    assert upstream_state["max_active"] == 2
+
+
+def test_full_queue_returns_503(monkeypatch):
+    monkeypatch.setattr(ai_chat, "AI_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(ai_chat, "AI_QUEUE_TIMEOUT_SECONDS", 0.1)
+
+    async def scenario():
+        slow = asyncio.ensure_future(ai_chat.complete(*_params("delay=0.5")))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as excinfo:
+            await ai_chat.complete(*_params("queued"))
+        await slow
+        return excinfo.value
+
+    error = asyncio.run(_run(scenario()))
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "5"
+
+
+def test_slow_upstream_returns_504(monkeypatch):
+    async def scenario():
+        ai_chat._loop_state()  # the client keeps its own, longer, HTTP timeout
+        monkeypatch.setattr(ai_chat, "AI_REQUEST_TIMEOUT_SECONDS", 0.2)
+        with pytest.raises(HTTPException) as excinfo:
+            await ai_chat.complete(*_params("delay=2"))
+        return excinfo.value
+
+    assert asyncio.run(_run(scenario())).status_code == 504
+
+
+class _Client:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+def test_abandoned_stream_closes_upstream():
+    async def scenario():
+        client = _Client()
+        params, key = _params("stream")
+        events = ai_chat.stream_completion(client, params, key)
+        first = await events.__anext__()
+        client.disconnected = True
+        rest = [event async for event in events]
+        for _ in range(100):
+            if upstream_state["closed"]:
+                break
+            await asyncio.sleep(0.02)
+        return first, rest, ai_chat._loop_state().semaphore
+
+    first, rest, semaphore = asyncio.run(_run(scenario()))
+    assert json.loads(first[len("data: "):]) == {"delta": WORDS[0]}
+    assert rest == []
+    assert upstream_state["closed"] == 1
+    assert semaphore._value == ai_chat.AI_MAX_CONCURRENCY
@@ -0,0 +1,39 @@
+import uuid
+
+from app.db.database import SessionLocal
+from app.models.user import User
+from app.services.passwords import password_hasher
+
+
+def _credentials():
+    name = f"user-{uuid.uuid4().hex[:12]}"
+    return {"email": f"{name}@example.com", "username": name, "password": "secret"}
+
+
+def test_register_then_login(client):
+    credentials = _credentials()
+    assert client.post("/api/auth/register", json=credentials).status_code == 200
+    assert client.post("/api/auth/register", json=credentials).status_code == 400
+
+    login = client.post("/api/auth/login", json={"username": credentials["username"], "password": "secret"})
+    assert login.status_code == 200
+    me = client.get("/api/auth/me", headers={"Authorization": f"Bearer {login.json()['access_token']}"})
+    assert me.json()["username"] == credentials["username"]
+
+    wrong = client.post("/api/auth/login", json={"username": credentials["username"], "password": "nope"})
+    assert wrong.status_code == 401
+
+
+def test_login_rehashes_when_cost_changes(client, monkeypatch):
+    credentials = _credentials()
+    client.post("/api/auth/register", json=credentials)
+    with SessionLocal() as db:
+        old_hash = db.query(User.hashed_password).filter(User.username == credentials["username"]).scalar()
+
+    monkeypatch.setattr(password_hasher, "rounds", password_hasher.rounds + 1)
+    login = client.post("/api/auth/login", json={"username": credentials["username"], "password": "secret"})
+    assert login.status_code == 200
+    with SessionLocal() as db:
+        new_hash = db.query(User.hashed_password).filter(User.username == credentials["username"]).scalar()
+    assert new_hash != old_hash
+    assert f"${password_hasher.rounds:02d}$" in new_hash
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal, engine
+from app.models.catalog import Product
+from app.services.catalog_cache import catalog_cache
+from app.services.http_cache import CATALOG_CACHE_CONTROL
+from app.services.row_blobs import row_blobs
+
+
+def test_outside_change_survives_a_later_local_commit(client, monkeypatch, make_product):
+    monkeypatch.setattr(catalog_cache, "revalidate_seconds", 0)
+    renamed, touched = make_product(), make_product()
+    assert client.get(f"/api/marketplace/products/{renamed}").status_code == 200
+
+    # Another worker renames one product...
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE products SET name = :name, updated_at = :now WHERE id = :id"),
+            {"name": "Renamed elsewhere", "now": datetime.utcnow(), "id": renamed},
+        )
+    # ...before this worker commits an unrelated change.
+    with SessionLocal() as db:
+        db.get(Product, touched).description = "touched"
+        db.commit()
+
+    response = client.get(f"/api/marketplace/products/{renamed}")
+    assert response.json()["name"] == "Renamed elsewhere"
+
+
+def test_local_commit_moves_last_modified_forward(client, make_product):
+    product_id = make_product()
+    before = datetime.utcnow() - timedelta(seconds=1)
+    with SessionLocal() as db:
+        db.get(Product, product_id).description = "changed"
+        db.commit()
+    assert catalog_cache.last_modified([Product.__tablename__]) >= before
+
+
+def test_local_write_does_not_reload_the_table(client, monkeypatch, auth_headers, make_product):
+    monkeypatch.setattr(catalog_cache, "revalidate_seconds", 0)
+    bought, other = make_product(stock_quantity=5), make_product()
+    for product_id in (bought, other):
+        assert client.get(f"/api/marketplace/products/{product_id}").status_code == 200
+    assert row_blobs.get(Product.__tablename__, other) is not None
+
+    purchase = client.post(f"/api/marketplace/products/{bought}/purchase", headers=auth_headers)
+    assert purchase.status_code == 200, purchase.text
+    assert client.get(f"/api/marketplace/products/{bought}").json()["stock_quantity"] == 4
+
+    # Only the bought product's blob was dropped; the re-probe after the
+    # purchase matched the token stored at its commit.
+    assert row_blobs.get(Product.__tablename__, other) is not None
+
+
+def test_marketplace_responses_are_revalidated(client):
+    assert client.get("/api/figures").headers["Cache-Control"] == CATALOG_CACHE_CONTROL
+    for path in ("/api/marketplace/products", "/api/marketplace/browse"):
+        response = client.get(path)
+        assert response.headers["Cache-Control"] == "no-cache"
+        assert client.get(path, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
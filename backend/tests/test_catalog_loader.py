@@ -0,0 +1,37 @@
+from app.db.catalog_loader import load_records
+from app.db.database import SessionLocal
+from app.models.catalog import Product
+
+
+def _product(product_id: int) -> Product:
+    with SessionLocal() as db:
+        return db.get(Product, product_id)
+
+
+def _reload(product_id: int, **options):
+    record = {"id": product_id, "name": "Reloaded", "description": "fixed", "price": 1.0, "stock_quantity": 100}
+    with SessionLocal() as db:
+        return load_records(db, "products", [record], **options)
+
+
+def test_reload_keeps_live_and_missing_columns(make_product):
+    product_id = make_product(stock_quantity=7, is_hot_item=True, tags=["kept"])
+    assert _reload(product_id)["updated"] == 1
+
+    product = _product(product_id)
+    assert (product.name, product.description) == ("Reloaded", "fixed")
+    assert (product.stock_quantity, product.is_hot_item) == (7, True)
+    assert product.tags == ["kept"]
+
+
+def test_update_live_overwrites_stock(make_product):
+    product_id = make_product(stock_quantity=7)
+    _reload(product_id, update_live=True)
+    assert _product(product_id).stock_quantity == 100
+
+
+def test_insert_sets_live_columns(database):
+    with SessionLocal() as db:
+        product_id = db.query(Product.id).order_by(Product.id.desc()).first()[0] + 1000
+    assert _reload(product_id)["inserted"] == 1
+    assert _product(product_id).stock_quantity == 100
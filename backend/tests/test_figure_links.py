@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.db.database import SessionLocal
+from app.models.catalog import FigureEventLink
+from app.services.figure_links import FigureLinks, rebuild_links
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def _link_count() -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(FigureEventLink))
+
+
+def test_concurrent_rebuilds_apply_the_same_links_once():
+    with SessionLocal() as db:
+        rebuild_links(db)
+    expected = _link_count()
+    assert expected > 0
+    with SessionLocal() as db:
+        db.execute(delete(FigureEventLink))
+        db.commit()
+
+    with SessionLocal() as db:
+        execute = db.execute
+        raced = []
+
+        def execute_after_another_worker(statement, *args, **kwargs):
+            # Another worker applies the same difference between this
+            # rebuild reading the existing links and writing its own.
+            if isinstance(statement, UpdateBase) and not raced:
+                raced.append(True)
+                with SessionLocal() as other:
+                    rebuild_links(other)
+            return execute(statement, *args, **kwargs)
+
+        db.execute = execute_after_another_worker
+        rebuild_links(db)
+
+    assert raced
+    assert _link_count() == expected
+
+
+def test_readers_wait_for_a_running_rebuild():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_session():
+        started.set()
+        release.wait(10)
+        return SessionLocal()
+
+    links = FigureLinks(slow_session)
+    links.mark_dirty()
+    writer = threading.Thread(target=links._rebuild)
+    writer.start()
+    assert started.wait(10)
+
+    reader = threading.Thread(target=asyncio.run, args=(links.ensure_fresh(),))
+    reader.start()
+    reader.join(0.2)
+    assert reader.is_alive()  # waiting on the rebuild, not reading old links
+    release.set()
+    for thread in (writer, reader):
+        thread.join(10)
+    assert not reader.is_alive()
+    assert not links._dirty
+
+
+def test_failed_or_overtaken_rebuild_stays_dirty():
+    def failing_session():
+        raise RuntimeError("database unavailable")
+
+    links = FigureLinks(failing_session)
+    links.mark_dirty()
+    with pytest.raises(RuntimeError):
+        links._rebuild()
+    assert links._dirty
+
+    def session_after_another_change():
+        links.mark_dirty()
+        return SessionLocal()
+
+    links = FigureLinks(session_after_another_change)
+    links.mark_dirty()
+    links._rebuild()
+    assert links._dirty
@@ -0,0 +1,30 @@
+"""Importing the app must stay cheap: heavy SDKs are imported on first use."""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Measured at about 1.3s; the slack is for slow CI runners.
+IMPORT_BUDGET_SECONDS = 5.0
+LAZY_MODULES = ("openai", "stripe", "passlib", "jose")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+def test_app_import_is_fast_and_skips_lazy_sdks():
+    # A fresh interpreter, so modules imported by other tests don't count.
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    assert probe["seconds"] < IMPORT_BUDGET_SECONDS
+    loaded = [name for name in LAZY_MODULES if name in probe["modules"]]
+    assert loaded == []
@@ -0,0 +1,117 @@
+"""Concurrent buyers can never take more stock than there is."""
+import os
+import subprocess
+import sys
+import threading
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import text
+
+from app.db.database import SessionLocal, engine
+from app.models.catalog import Product
+from app.services.hot_inventory import hot_inventory
+from app.services.inventory import reserve_stock
+
+pytestmark = pytest.mark.usefixtures("database")
+
+BUYERS = 16
+STOCK = 40
+
+
+def _stock(product_id: int) -> int:
+    with SessionLocal() as db:
+        return db.get(Product, product_id).stock_quantity
+
+
+def _buy_until_sold_out(orders: List[Dict[int, int]]) -> List[int]:
+    """Each buyer thread places its order repeatedly until it is refused;
+    returns how many orders each thread placed."""
+    placed = [0] * len(orders)
+    errors = []
+    start = threading.Barrier(len(orders))
+
+    def buyer(index: int) -> None:
+        try:
+            start.wait()
+            while True:
+                with SessionLocal() as db:
+                    if reserve_stock(db, orders[index])[0]:
+                        return
+                    db.commit()
+                    placed[index] += 1
+        except Exception as exc:  # surfaced below; a thread can't fail the test itself
+            errors.append(exc)
+
+    threads = [threading.Thread(target=buyer, args=(i,)) for i in range(len(orders))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+    assert not errors, errors
+    return placed
+
+
+def test_concurrent_single_item_purchases_never_oversell(make_product):
+    product_id = make_product(stock_quantity=STOCK)
+    placed = _buy_until_sold_out([{product_id: 1}] * BUYERS)
+    assert sum(placed) == STOCK
+    assert _stock(product_id) == 0
+
+
+def test_concurrent_multi_line_orders_never_oversell(make_product):
+    # Buyers list the lines in opposite orders; reserve_stock locks rows in
+    # id order either way, so none of them deadlock.
+    first, second = make_product(stock_quantity=STOCK), make_product(stock_quantity=STOCK)
+    orders = [{first: 1, second: 2} if i % 2 else {second: 2, first: 1} for i in range(BUYERS)]
+    placed = _buy_until_sold_out(orders)
+    assert sum(placed) == STOCK // 2
+    assert _stock(first) == STOCK - STOCK // 2
+    assert _stock(second) == 0
+
+
+def test_short_line_rolls_back_the_whole_order(make_product):
+    plenty, scarce = make_product(stock_quantity=10), make_product(stock_quantity=1)
+    with SessionLocal() as db:
+        shortfalls, _ = reserve_stock(db, {plenty: 3, scarce: 2})
+    assert shortfalls == [{"product_id": scarce, "requested": 2, "available": 1}]
+    assert _stock(plenty) == 10
+    assert _stock(scarce) == 1
+
+
+def test_concurrent_hot_item_purchases_never_oversell(make_product):
+    product_id = make_product(stock_quantity=STOCK, is_hot_item=True)
+    placed = _buy_until_sold_out([{product_id: 1}] * BUYERS)
+    assert sum(placed) == STOCK
+    assert _stock(product_id) + hot_inventory.held(product_id) == 0
+
+
+def test_order_response_stock_follows_the_lines_reserve_stock_served(client, auth_headers, make_product):
+    product_id = make_product(stock_quantity=10)
+    with SessionLocal() as db:
+        assert product_id not in hot_inventory.hot_ids(db)
+    # Flagged hot by another worker: this one's cached hot ids don't know
+    # yet, so the line is taken from the row rather than a lease.
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE products SET is_hot_item = 1 WHERE id = :id"), {"id": product_id})
+
+    assert client.post("/api/cart", json={"product_id": product_id, "quantity": 2}, headers=auth_headers).status_code == 200
+    order = client.post("/api/orders", headers=auth_headers)
+    assert order.status_code == 200, order.text
+    assert order.json()["items"][0]["product"]["stock_quantity"] == 8
+    assert _stock(product_id) == 8
+
+
+def test_lease_pool_is_opened_on_the_first_lease():
+    from app.services import hot_inventory as module
+
+    assert module.hot_inventory._session_factory is module._lease_session
+    # Importing the app leases nothing, so no lease engine exists until a
+    # hot item is bought (as in the hot-item tests above).
+    probe = subprocess.run(
+        [sys.executable, "-c", "import app.main, app.services.hot_inventory as h; print(h._lease_sessions)"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True, text=True, timeout=120,
+    )
+    assert probe.returncode == 0, probe.stderr
+    assert probe.stdout.strip().splitlines()[-1] == "None"
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db.database import ASYNC_DATABASE_URL
+from app.models.catalog import Product
+from app.services.pagination import PageParams
+from app.services.product_facets import ProductFacetIndex
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+async def _concurrent_browses(index: ProductFacetIndex, filters, readers: int = 4):
+    engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    sessions = async_sessionmaker(engine)
+
+    async def browse():
+        async with sessions() as db:
+            await index.ensure_fresh(db)
+            return index.browse(filters, PageParams(limit=10))[1]
+
+    try:
+        return await asyncio.gather(*(browse() for _ in range(readers)))
+    finally:
+        await engine.dispose()
+
+
+async def _active_products(category=None) -> int:
+    engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    try:
+        async with async_sessionmaker(engine)() as db:
+            stmt = select(func.count()).select_from(Product).where(Product.is_active == True)
+            if category:
+                stmt = stmt.where(Product.category == category)
+            return await db.scalar(stmt)
+    finally:
+        await engine.dispose()
+
+
+def test_concurrent_readers_wait_for_the_cold_build():
+    expected = asyncio.run(_active_products())
+    assert expected > 0
+    totals = asyncio.run(_concurrent_browses(ProductFacetIndex(), {}))
+    assert totals == [expected] * len(totals)
+
+
+def test_concurrent_readers_wait_for_dirty_rows(make_product):
+    index = ProductFacetIndex()
+    asyncio.run(_concurrent_browses(index, {}, readers=1))
+    product_id = make_product(category="Facet race")
+    index._on_change([("insert", Product.__tablename__, {"id": product_id})])
+    totals = asyncio.run(_concurrent_browses(index, {"category": ["Facet race"]}))
+    assert totals == [1] * len(totals)
@@ -0,0 +1,60 @@
+"""Cart, order and checkout endpoints must not issue a query per item."""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+import app.main as main
+from query_counter import count_queries
+
+
+class _FakeCheckoutSession:
+    @staticmethod
+    def create(**params):
+        session_id = f"cs_test_{uuid.uuid4().hex}"
+        return SimpleNamespace(id=session_id, url=f"https://checkout.test/{session_id}")
+
+
+@pytest.fixture
+def fake_stripe(monkeypatch):
+    monkeypatch.setattr(main, "STRIPE_SECRET_KEY", "sk_test")
+    monkeypatch.setattr(main, "_stripe", SimpleNamespace(checkout=SimpleNamespace(Session=_FakeCheckoutSession)))
+
+
+def _fill_cart(client, headers, product_ids):
+    for product_id in product_ids:
+        response = client.post("/api/cart", json={"product_id": product_id, "quantity": 1}, headers=headers)
+        assert response.status_code == 200, response.text
+
+
+def _query_counts(client, headers, make_product, items: int):
+    product_ids = [make_product(price=5.0, stock_quantity=1000) for _ in range(items)]
+    client.get("/api/auth/me", headers=headers)  # warm the auth cache
+    counts = {}
+
+    _fill_cart(client, headers, product_ids)
+    with count_queries() as statements:
+        assert len(client.get("/api/cart", headers=headers).json()) == items
+    counts["GET /api/cart"] = len(statements)
+
+    with count_queries() as statements:
+        assert client.post("/api/checkout/session", headers=headers).status_code == 200
+    counts["POST /api/checkout/session"] = len(statements)
+
+    with count_queries() as statements:
+        order = client.post("/api/orders", headers=headers)
+    assert order.status_code == 200, order.text
+    assert len(order.json()["items"]) == items
+    counts["POST /api/orders"] = len(statements)
+
+    with count_queries() as statements:
+        assert client.get("/api/orders", headers=headers).status_code == 200
+    counts["GET /api/orders"] = len(statements)
+    return counts
+
+
+def test_query_counts_do_not_grow_with_items(client, make_auth_headers, make_product, fake_stripe):
+    # A new user per size, so each starts from an empty cart and order history.
+    one = _query_counts(client, make_auth_headers(), make_product, 1)
+    twenty = _query_counts(client, make_auth_headers(), make_product, 20)
+    assert twenty == one
@@ -0,0 +1,45 @@
+import time
+from types import SimpleNamespace
+
+from starlette.requests import Request
+
+from app.db.database import READ_YOUR_WRITES_HEADER, READ_YOUR_WRITES_SECONDS, use_replica
+from app.services.catalog_cache import CatalogCache
+
+
+def _request(method="GET", headers=None):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": method, "headers": raw})
+
+
+def test_write_response_carries_the_deadline_header(client, auth_headers):
+    response = client.get("/api/cart", headers=auth_headers)
+    assert READ_YOUR_WRITES_HEADER not in response.headers
+    response = client.post("/api/cart", json={"product_id": 1, "quantity": 1}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    deadline = float(response.headers[READ_YOUR_WRITES_HEADER])
+    assert 0 < deadline - time.time() <= READ_YOUR_WRITES_SECONDS
+
+
+def test_deadline_header_pins_reads_to_the_primary():
+    now = time.time()
+    assert use_replica(_request())
+    assert not use_replica(_request(headers={READ_YOUR_WRITES_HEADER: str(now + 1)}))
+    assert use_replica(_request(headers={READ_YOUR_WRITES_HEADER: str(now - 1)}))
+    assert use_replica(_request(headers={READ_YOUR_WRITES_HEADER: str(now + READ_YOUR_WRITES_SECONDS + 60)}))
+    assert use_replica(_request(headers={READ_YOUR_WRITES_HEADER: "soon"}))
+    assert not use_replica(_request(headers={"Cookie": "db_primary=1"}))
+    assert not use_replica(_request("POST"))
+
+
+def test_replica_reads_right_after_a_local_commit_are_not_settled():
+    cache = CatalogCache()
+    primary, replica = object(), object()
+    on_replica = SimpleNamespace(info={"use_replica": True, "primary": primary, "replica": replica})
+    on_primary = SimpleNamespace(info={"use_replica": False, "primary": primary, "replica": replica})
+
+    assert cache.settled(on_replica, ["products"])
+    cache._on_change([("update", "products", {"id": 1})])
+    assert not cache.settled(on_replica, ["products"])
+    assert cache.settled(on_replica, ["historical_figures"])
+    assert cache.settled(on_primary, ["products"])
@@ -0,0 +1,25 @@
+import pytest
+
+from app.db.database import SessionLocal
+from app.models.catalog import HistoricalFigure
+from app.services.search_index import SearchIndex
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def test_commit_applied_during_a_load_keeps_the_kind_stale():
+    index = SearchIndex()
+    with SessionLocal() as db:
+        query = db.query
+
+        def query_during_commit(*entities):
+            index._on_change([("update", HistoricalFigure.__tablename__, {"id": 1, "name": "Renamed"})])
+            return query(*entities)
+
+        db.query = query_during_commit
+        index.load(db, ["figure"])
+        assert len(index) > 0 and "figure" in index._stale
+
+        db.query = query
+        index.load(db, ["figure"])
+        assert "figure" not in index._stale
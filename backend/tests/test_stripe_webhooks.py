@@ -0,0 +1,51 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.database import SessionLocal
+from app.models.commerce import Order, StripeEvent
+from app.services import stripe_webhooks
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def _store(event_id: str, payload: str, received_at: datetime) -> None:
+    with SessionLocal() as db:
+        db.add(StripeEvent(
+            id=event_id, type="checkout.session.completed", payload=payload,
+            status="pending", attempts=0, received_at=received_at,
+        ))
+        db.commit()
+
+
+def _checkout_event(session_id: str) -> str:
+    return json.dumps({"data": {"object": {"id": session_id, "payment_intent": f"pi_{session_id}"}}})
+
+
+def test_malformed_event_does_not_block_or_fail_the_rest(monkeypatch):
+    monkeypatch.setattr(stripe_webhooks, "WEBHOOK_MAX_ATTEMPTS", 3)
+    session_id = f"cs_{uuid.uuid4().hex}"
+    with SessionLocal() as db:
+        order = Order(user_id=1, status="pending", total_amount=5.0, stripe_checkout_session_id=session_id)
+        db.add(order)
+        db.commit()
+        order_id = order.id
+
+    bad_id, good_id = f"evt_bad_{uuid.uuid4().hex}", f"evt_good_{uuid.uuid4().hex}"
+    received_at = datetime.utcnow() - timedelta(days=1)
+    _store(bad_id, "{not json", received_at)  # first in the inbox
+    _store(good_id, _checkout_event(session_id), received_at + timedelta(seconds=1))
+
+    with SessionLocal() as db:
+        for _ in range(3):
+            stripe_webhooks.process_pending_events(db)
+
+    with SessionLocal() as db:
+        bad, good = db.get(StripeEvent, bad_id), db.get(StripeEvent, good_id)
+        assert (good.status, good.attempts) == ("processed", 1)
+        assert (bad.status, bad.attempts) == ("failed", 3)
+        assert bad.last_error
+        order = db.get(Order, order_id)
+        assert (order.status, order.stripe_payment_intent_id) == ("completed", f"pi_{session_id}")
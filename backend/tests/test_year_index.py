@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db.database import ASYNC_DATABASE_URL
+from app.models.catalog import HistoricalEvent
+from app.services.year_index import YearIndex
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def test_commit_applied_during_a_load_keeps_the_index_stale():
+    index = YearIndex()
+
+    class CommitDuringQuery:
+        """Session stand-in that applies a commit while the load's query runs."""
+
+        def __init__(self, db):
+            self.db, self.info = db, db.info
+
+        async def execute(self, statement):
+            index._on_change([("update", HistoricalEvent.__tablename__, {"id": 1, "year": 1})])
+            return await self.db.execute(statement)
+
+    async def scenario():
+        engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+        try:
+            async with async_sessionmaker(engine)() as db:
+                await index.ensure_loaded(CommitDuringQuery(db))
+                assert len(index) > 0 and index._stale
+                await index.ensure_loaded(db)
+                assert not index._stale
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
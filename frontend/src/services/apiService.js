@@ -1,4 +1,5 @@
 import axios from "axios";
+import { attachReadYourWrites } from "./readYourWrites";
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || "http://localhost:8000";
 
@@ -9,6 +10,8 @@ const api = axios.create({
   },
 });
 
+attachReadYourWrites(api);
+
 const apiService = {
   getFigures: () => api.get("/api/figures"),
   getFigure: (id) => api.get(`/api/figures/${id}`),
@@ -1,4 +1,5 @@
 import axios from "axios";
+import { attachReadYourWrites } from "./readYourWrites";
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || "http://localhost:8000";
 
@@ -7,6 +8,8 @@ const api = axios.create({
   headers: { "Content-Type": "application/json" },
 });
 
+attachReadYourWrites(api);
+
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem("access_token");
   if (token) {
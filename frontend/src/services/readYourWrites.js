@@ -0,0 +1,23 @@
+// After a write the API returns an X-Read-Your-Writes deadline; sending it
+// back until then keeps this client's reads on the primary database, so it
+// sees its own changes even when a read replica lags behind.
+const HEADER = "X-Read-Your-Writes";
+
+let pinnedUntil = 0;
+
+export const attachReadYourWrites = (api) => {
+  api.interceptors.request.use((config) => {
+    if (pinnedUntil > Date.now() / 1000) {
+      config.headers[HEADER] = pinnedUntil;
+    }
+    return config;
+  });
+  api.interceptors.response.use((response) => {
+    const deadline = parseFloat(response.headers[HEADER.toLowerCase()]);
+    if (deadline > pinnedUntil) {
+      pinnedUntil = deadline;
+    }
+    return response;
+  });
+  return api;
+};